@@ -0,0 +1,74 @@
+"""
+Single-file store of named NumPy arrays that can be memory-mapped.
+
+Layout: 8-byte magic, 8-byte little-endian header length, a JSON header
+({"arrays": {name: {dtype, shape, offset}}, "meta": {...}}), then each
+array's raw bytes at a 64-byte aligned offset. Reading maps the file once
+read-only and returns zero-copy views, so several processes that open the
+same file share its pages through the OS page cache.
+"""
+import json
+import os
+import struct
+
+from lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+
+MAGIC = b"FLTARR01"
+ALIGN = 64
+
+
+def _align(n):
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+def write_arrays(path, arrays, meta=None):
+    """Writes `arrays` (name -> ndarray) and a JSON-able `meta` dict atomically."""
+    # ascontiguousarray alone would turn 0-d arrays into 1-d ones
+    arrays = {name: np.ascontiguousarray(a).reshape(np.shape(a)) for name, a in arrays.items()}
+    for name, a in arrays.items():
+        if a.dtype.hasobject:
+            raise TypeError(f"{name}: object arrays cannot be memory-mapped; use a fixed-width dtype")
+
+    # The header holds the offsets, so size it first with placeholder offsets
+    entries = {name: {"dtype": a.dtype.str, "shape": list(a.shape), "offset": 0} for name, a in arrays.items()}
+    header_len = len(json.dumps({"arrays": entries, "meta": meta or {}}).encode()) + 32 * len(entries)
+    offset = _align(len(MAGIC) + 8 + header_len)
+    for name, a in arrays.items():
+        entries[name]["offset"] = offset
+        offset = _align(offset + a.nbytes)
+    header = json.dumps({"arrays": entries, "meta": meta or {}}).encode().ljust(header_len)
+
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(MAGIC)
+        f.write(struct.pack("<Q", len(header)))
+        f.write(header)
+        for name, a in arrays.items():
+            f.seek(entries[name]["offset"])
+            f.write(a.tobytes())
+        f.truncate(max(offset, f.tell()))
+    os.replace(tmp_path, path)
+
+
+def read_arrays(path):
+    """Returns (arrays, meta); arrays are read-only views over one shared mapping."""
+    with open(path, "rb") as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f"{path} is not an array store file")
+        (header_len,) = struct.unpack("<Q", f.read(8))
+        header = json.loads(f.read(header_len))
+
+    mapping = np.memmap(path, dtype=np.uint8, mode="r")
+    arrays = {}
+    for name, entry in header["arrays"].items():
+        dtype = np.dtype(entry["dtype"])
+        shape = tuple(entry["shape"])
+        count = int(np.prod(shape)) if shape else 1
+        if count == 0:
+            arrays[name] = np.empty(shape, dtype=dtype)
+            continue
+        view = np.frombuffer(mapping, dtype=dtype, count=count, offset=entry["offset"])
+        arrays[name] = view.reshape(shape)
+    return arrays, header["meta"]
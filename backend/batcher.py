@@ -0,0 +1,75 @@
+import asyncio
+
+
+class MicroBatcher:
+    """
+    Coalesces concurrent single-item predictions into one vectorized call.
+
+    Items submitted for the same kind are held for at most `max_wait`
+    seconds, or until `max_items` have arrived, then scored together by
+    `run_batch(kind, items)` (an async callable returning one result per
+    item, in order). Every caller gets its own result back. Like
+    InferenceExecutor, this is only used from the event loop thread, so the
+    pending lists need no lock.
+    """
+
+    def __init__(self, run_batch, max_items=64, max_wait=0.002):
+        self.run_batch = run_batch
+        self.max_items = max_items
+        self.max_wait = max_wait
+        self._pending = {}  # kind -> [(item, future)]
+        self._timers = {}   # kind -> TimerHandle
+        # The loop only keeps weak references to tasks: hold in-flight flushes here
+        self._tasks = set()
+
+        self.batches = 0
+        self.items = 0
+        self.largest = 0
+
+    async def submit(self, kind, item):
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        pending = self._pending.setdefault(kind, [])
+        pending.append((item, future))
+
+        if len(pending) >= self.max_items:
+            self._flush_soon(kind)
+        elif len(pending) == 1:
+            self._timers[kind] = loop.call_later(self.max_wait, self._flush_soon, kind)
+        return await future
+
+    def _flush_soon(self, kind):
+        timer = self._timers.pop(kind, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(kind, [])
+        if batch:
+            task = asyncio.ensure_future(self._flush(kind, batch))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _flush(self, kind, batch):
+        self.batches += 1
+        self.items += len(batch)
+        self.largest = max(self.largest, len(batch))
+        try:
+            results = await self.run_batch(kind, [item for item, _ in batch])
+        except Exception as e:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        for (_, future), result in zip(batch, results):
+            # The caller may have gone away (client disconnect cancels it)
+            if not future.done():
+                future.set_result(result)
+
+    def stats(self):
+        return {
+            "max_items": self.max_items,
+            "max_wait_ms": self.max_wait * 1e3,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "largest_batch": self.largest,
+        }
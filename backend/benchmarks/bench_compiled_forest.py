@@ -0,0 +1,102 @@
+"""
+Chart 2: sklearn Pipeline.predict_proba vs CompiledForestPipeline.
+
+Uses a real flight_model.pkl when given, otherwise fits the production
+pipeline (train_modelbc.build_pipeline) on a synthetic df_trainable. Checks
+that both engines return bit-identical probabilities, then times single
+rows and batches.
+
+    python benchmarks/bench_compiled_forest.py [--model flight_model.pkl] [--json out.json]
+"""
+import argparse
+import json
+import os
+import sys
+import time
+
+import joblib
+import numpy as np
+import pandas as pd
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+sys.path.insert(0, os.path.join(BACKEND, "model"))
+from compiled_forest import CompiledForestPipeline
+import train_modelbc
+
+BATCH_SIZES = [1, 64, 1000, 10000]
+
+
+def synthetic_trainable(n_carriers=17, n_airports=360, seed=0):
+    """One row per (carrier, airport, month) with BTS-like magnitudes."""
+    rng = np.random.default_rng(seed)
+    keys = pd.MultiIndex.from_product(
+        [[f"C{i}" for i in range(n_carriers)], [f"A{i:03d}" for i in range(n_airports)], range(1, 13)],
+        names=train_modelbc.GROUP_KEYS,
+    ).to_frame(index=False)
+    keys = keys.sample(frac=0.4, random_state=seed).reset_index(drop=True)
+    n = len(keys)
+    flights = rng.integers(10, 3000, n).astype(float)
+    delayed = flights * rng.uniform(0.05, 0.4, n)
+    weather = delayed * rng.uniform(0, 0.2, n)
+    keys["WeatherDelayProportion"] = weather / delayed
+    keys["WeatherMinuteProportion"] = rng.uniform(0, 0.2, n)
+    keys["TotalFlights"] = flights
+    keys["WeatherDelayCount"] = weather
+    keys["TotalDelayedFlights"] = delayed
+    train_modelbc.label_trainable(keys)
+    return keys
+
+
+def median_ms(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return float(np.median(samples) * 1e3)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", help="flight_model.pkl to benchmark (default: synthetic)")
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    if args.model:
+        pkg = joblib.load(args.model)
+        pipeline, df_trainable = pkg["pipeline"], pkg["avg_df"]
+    else:
+        df_trainable = synthetic_trainable()
+        pipeline = train_modelbc.build_pipeline()
+        pipeline.fit(df_trainable.drop(columns=train_modelbc.TARGET_COLUMNS), df_trainable["HighWeatherImpact_Class"])
+    compiled = CompiledForestPipeline.from_pipeline(pipeline)
+
+    X = df_trainable.drop(columns=train_modelbc.TARGET_COLUMNS)
+    records = X.to_dict("records")
+    identical = bool(np.array_equal(pipeline.predict_proba(X), compiled.predict_proba(X)))
+    print(f"{len(X)} rows, {len(compiled.roots)} trees, depth {compiled.depth}; identical output: {identical}")
+
+    results = {"rows": len(X), "identical": identical, "batches": []}
+    rng = np.random.default_rng(1)
+    for size in BATCH_SIZES:
+        idx = rng.integers(0, len(X), size)
+        frame = X.iloc[idx]
+        rows = [records[i] for i in idx]
+        repeat = 200 if size <= 64 else 10
+        sk_ms = median_ms(lambda: pipeline.predict_proba(frame), repeat)
+        np_ms = median_ms(lambda: compiled.predict_proba(frame), repeat)
+        rec_ms = median_ms(lambda: compiled.predict_proba(rows), repeat)
+        results["batches"].append({
+            "batch": size, "sklearn_ms": sk_ms, "numpy_dataframe_ms": np_ms, "numpy_records_ms": rec_ms,
+        })
+        print(f"batch {size:>6}: sklearn {sk_ms:9.3f} ms  numpy(df) {np_ms:9.3f} ms  "
+              f"numpy(records) {rec_ms:9.3f} ms  speedup x{sk_ms / rec_ms:5.1f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
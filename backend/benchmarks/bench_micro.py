@@ -0,0 +1,105 @@
+"""
+Micro-benchmarks of the /predict hot spots, called directly (no HTTP):
+
+  - get_yearly_trend / get_competitor_analysis on the Chart 2 index
+  - Chart 3 encode -> scale -> predict_proba (score_severity_batch, no cache)
+  - Chart 2 end to end (score_seasonal_batch, no cache)
+  - route cube slices: all carriers at an airport, top 10 routes of the year
+
+Uses synthetic models unless --model-dir is given; reports median and p99
+per call and writes JSON that bench_server's --baseline check understands.
+
+    python benchmarks/bench_micro.py [--model-dir DIR] [--json out.json] [--baseline old.json]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import report
+import synthetic
+
+BATCH_SIZES = [1, 64]
+
+
+def time_calls(fn, args_list, repeat=3):
+    """Per-call latency over every argument tuple, `repeat` passes."""
+    samples = []
+    for _ in range(repeat):
+        for args in args_list:
+            start = time.perf_counter()
+            fn(*args)
+            samples.append(time.perf_counter() - start)
+    return report.latency_summary(samples)
+
+
+def run(model_dir, n, seed):
+    from inference import get_competitor_analysis, get_yearly_trend, score_seasonal_batch, score_severity_batch
+    from registry import ModelRegistry
+
+    registry = ModelRegistry(model_dir)
+    registry.load_all()
+    flight, severity = registry.get("flight"), registry.get("severity")
+    cube = flight["cube"]
+    index, encoders = flight["index"], severity["encoders"]
+
+    rng = np.random.default_rng(seed)
+    keys = [
+        (str(rng.choice(flight["carriers"])), str(rng.choice(flight["airports"])), int(rng.integers(1, 13)))
+        for _ in range(n)
+    ]
+    severity_items = [{
+        "Airline": str(rng.choice(encoders["airline"].classes_)),
+        "Departure_Airport": str(rng.choice(encoders["departure"].classes_)),
+        "Arrival_Airport": str(rng.choice(encoders["arrival"].classes_)),
+        "Departure_Time": f"{rng.integers(1, 29)}/{rng.integers(1, 13)}/2024 {rng.integers(0, 24)}:{rng.integers(0, 60):02d}",
+        "Flight_Status": str(rng.choice(encoders["status"].classes_)),
+    } for _ in range(n)]
+    seasonal_items = [{"year": 2024, "month": m, "carrier": c, "airport": a} for c, a, m in keys]
+
+    results = {
+        "get_yearly_trend": time_calls(get_yearly_trend, [(c, a, index) for c, a, _ in keys]),
+        "get_competitor_analysis": time_calls(get_competitor_analysis, [(c, a, m, index) for c, a, m in keys]),
+        "cube_airport_month": time_calls(lambda a, m: cube.query(airport=a, month=m), [(a, m) for _, a, m in keys]),
+        "cube_top10_year": time_calls(lambda: cube.query(top=10, order="highest"), [()] * 200),
+    }
+    for size in BATCH_SIZES:
+        chunks = lambda items: [(items[i:i + size],) for i in range(0, len(items) - size + 1, size)][:200]
+        results[f"severity_encode_scale_predict_x{size}"] = time_calls(
+            lambda batch: score_severity_batch(severity, batch), chunks(severity_items), repeat=1)
+        results[f"seasonal_score_x{size}"] = time_calls(
+            lambda batch: score_seasonal_batch(flight, batch), chunks(seasonal_items), repeat=1)
+    results["rss_mb"] = report.rss_mb()
+
+    for name, summary in results.items():
+        if isinstance(summary, dict):
+            print(f"{name:>36}: p50 {summary['p50_ms']:8.4f} ms  p99 {summary['p99_ms']:8.4f} ms")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-dir", help="use these models (default: fresh synthetic models)")
+    parser.add_argument("--calls", type=int, default=2000, help="distinct inputs per benchmark")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="fail if latency regressed against this result file")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    with tempfile.TemporaryDirectory(prefix="bench-models-") as tmp_dir:
+        model_dir = args.model_dir or synthetic.build_models(tmp_dir, seed=args.seed)
+        results = run(model_dir, args.calls, args.seed)
+
+    report.finish(results, args.json, args.baseline, args.tolerance)
+
+
+if __name__ == "__main__":
+    main()
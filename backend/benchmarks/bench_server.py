@@ -0,0 +1,145 @@
+"""
+In-process load test of the FastAPI backend.
+
+Starts main.app (startup handlers included) against MODEL_DIR, by default
+synthetic models built by benchmarks/synthetic.py into a temporary
+directory, and drives fixed, seeded request mixes through httpx's ASGI
+transport: no sockets, no network. Reports p50/p99 latency, throughput
+and RSS per mix.
+
+    python benchmarks/bench_server.py [--model-dir DIR] [--requests 2000] [--concurrency 16]
+                                      [--json out.json] [--baseline old.json]
+
+Server knobs (PREDICT_CACHE_SIZE, MICROBATCH_WAIT_MS, INFERENCE_WORKERS, ...)
+are read from the environment as usual. The prediction cache is off unless
+PREDICT_CACHE_SIZE is set, so every request reaches the models.
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+import report
+import synthetic
+
+WARMUP = 50
+
+
+def build_mixes(registry, n, seed=0):
+    """Fixed request lists per mix, drawn from the loaded models' own vocabularies."""
+    rng = np.random.default_rng(seed)
+    flight = registry.get("flight")
+    encoders = registry.get("severity")["encoders"]
+
+    def pick(values):
+        return str(values[rng.integers(len(values))])
+
+    def chart1():
+        return ("POST", "/predict", {
+            "weather_delay_count": int(rng.integers(0, 12)),
+            "carrier_delay_count": int(rng.integers(0, 40)),
+            "late_aircraft_count": int(rng.integers(0, 40)),
+            "cancelled_flights": int(rng.integers(0, 3)),
+        })
+
+    def chart2():
+        return ("POST", "/predict", {
+            "year": 2024, "month": int(rng.integers(1, 13)),
+            "carrier": pick(flight["carriers"]), "airport": pick(flight["airports"]),
+        })
+
+    def chart3():
+        return ("POST", "/predict", {
+            "Airline": pick(encoders["airline"].classes_),
+            "Departure_Airport": pick(encoders["departure"].classes_),
+            "Arrival_Airport": pick(encoders["arrival"].classes_),
+            "Departure_Time": f"{rng.integers(1, 29)}/{rng.integers(1, 13)}/2024 {rng.integers(0, 24)}:{rng.integers(0, 60):02d}",
+            "Flight_Status": pick(encoders["status"].classes_),
+        })
+
+    def options():
+        return ("GET", "/options", None)
+
+    makers = {"chart1": chart1, "chart2": chart2, "chart3": chart3, "options": options}
+    mixes = {name: [make() for _ in range(n)] for name, make in makers.items()}
+    # Roughly what the dashboard sends: mostly Chart 2/3, some calculator and dropdown loads
+    weights = {"chart1": 0.15, "chart2": 0.4, "chart3": 0.4, "options": 0.05}
+    names = rng.choice(list(weights), n, p=list(weights.values()))
+    mixes["mixed"] = [makers[name]() for name in names]
+    return mixes
+
+
+async def run_mix(client, requests, concurrency):
+    latencies = [0.0] * len(requests)
+    statuses = {}
+    queue = iter(enumerate(requests))
+
+    async def worker():
+        for i, (method, path, body) in queue:
+            start = time.perf_counter()
+            response = await client.request(method, path, json=body)
+            latencies[i] = time.perf_counter() - start
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*[worker() for _ in range(concurrency)])
+    elapsed = time.perf_counter() - start
+    return latencies, statuses, elapsed
+
+
+async def bench(args):
+    import httpx
+    import main
+
+    results = {"requests": args.requests, "concurrency": args.concurrency, "mixes": {}}
+    async with main.app.router.lifespan_context(main.app):
+        results["rss_after_load_mb"] = report.rss_mb()
+        mixes = build_mixes(main.REGISTRY, args.requests + WARMUP, args.seed)
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+            for name, requests in mixes.items():
+                await run_mix(client, requests[:WARMUP], args.concurrency)
+                latencies, statuses, elapsed = await run_mix(client, requests[WARMUP:], args.concurrency)
+                summary = {
+                    **report.latency_summary(latencies),
+                    "throughput_rps": len(latencies) / elapsed,
+                    "rss_mb": report.rss_mb(),
+                    "statuses": {str(k): v for k, v in sorted(statuses.items())},
+                }
+                results["mixes"][name] = summary
+                print(f"{name:>8}: p50 {summary['p50_ms']:8.3f} ms  p99 {summary['p99_ms']:8.3f} ms  "
+                      f"{summary['throughput_rps']:9.1f} req/s  RSS {summary['rss_mb']:7.1f} MB  {summary['statuses']}")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model-dir", help="serve these models (default: fresh synthetic models)")
+    parser.add_argument("--requests", type=int, default=2000, help="measured requests per mix")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="write results to this file")
+    parser.add_argument("--baseline", help="fail if latency/throughput regressed against this result file")
+    parser.add_argument("--tolerance", type=float, default=0.2)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="bench-models-") as tmp_dir:
+        model_dir = args.model_dir or synthetic.build_models(tmp_dir, seed=args.seed)
+        os.environ["MODEL_DIR"] = model_dir
+        os.environ["MODEL_RELOAD_INTERVAL"] = "0"
+        os.environ.setdefault("PREDICT_CACHE_SIZE", "0")
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+        results = asyncio.run(bench(args))
+
+    report.finish(results, args.json, args.baseline, args.tolerance)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,114 @@
+"""
+Chart 3 severity engines: KNeighborsClassifier vs IndexedSeverityModel.
+
+Generates encoded rows with the cardinalities of flight_data_prices.csv,
+fits both engines and reports fit time, artifact size, load time and heap,
+and single-row / batch predict_proba latency.
+
+    python benchmarks/bench_severity_index.py --sizes 10000 100000 1000000
+"""
+import argparse
+import json
+import os
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import joblib
+import numpy as np
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.preprocessing import StandardScaler
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from severity_index import IndexedSeverityModel
+
+# Dep_Hour, Dep_Day, Dep_Month, Dep_Weekday, Airline, Departure, Arrival, Status
+CARDINALITIES = [(0, 24), (1, 32), (1, 13), (0, 7), (0, 5), (0, 8), (0, 8), (0, 3)]
+CLASSES = np.array(["Major", "Minor", "No Delay"])
+
+
+def make_rows(n, seed=0):
+    rng = np.random.default_rng(seed)
+    X = np.column_stack([rng.integers(lo, hi, n) for lo, hi in CARDINALITIES]).astype(np.float64)
+    # Status drives most of the label, like the real data
+    noise = rng.random(n)
+    y = np.where(X[:, 7] == 1, np.where(noise < 0.5, 0, 1), np.where(noise < 0.8, 2, 1))
+    return X, CLASSES[y]
+
+
+def timed(fn, repeat=1):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return float(np.median(samples))
+
+
+def measure(name, make_model, X, y, queries, tmp_dir):
+    model = make_model()
+    fit_s = timed(lambda: model.fit(X, y))
+
+    path = os.path.join(tmp_dir, f"{name}.pkl")
+    joblib.dump({"model": model}, path)
+    load_kwargs = {"mmap_mode": "r"} if name == "indexed" else {}
+
+    tracemalloc.start()
+    load_s = timed(lambda: joblib.load(path, **load_kwargs))
+    _, load_peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    loaded = joblib.load(path, **load_kwargs)["model"]
+    single_ms = timed(lambda: loaded.predict_proba(queries[:1]), repeat=200) * 1e3
+    batch_ms = timed(lambda: loaded.predict_proba(queries), repeat=5) * 1e3
+
+    return {
+        "engine": name,
+        "fit_s": fit_s,
+        "artifact_bytes": os.path.getsize(path),
+        "load_s": load_s,
+        "load_heap_bytes": load_peak,
+        "single_row_ms": single_ms,
+        "batch_ms": batch_ms,
+        "batch_rows": len(queries),
+        "proba": loaded.predict_proba(queries),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000, 1_000_000])
+    parser.add_argument("--queries", type=int, default=1000)
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    results = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for n in args.sizes:
+            X, y = make_rows(n)
+            scaler = StandardScaler().fit(X)
+            X_scaled = scaler.transform(X)
+            queries = scaler.transform(make_rows(args.queries, seed=1)[0])
+
+            knn = measure("knn", lambda: KNeighborsClassifier(n_neighbors=5), X_scaled, y, queries, tmp_dir)
+            indexed = measure("indexed", lambda: IndexedSeverityModel(n_neighbors=5), X_scaled, y, queries, tmp_dir)
+            # Same votes unless equidistant neighbours are split differently
+            agreement = float((knn["proba"].argmax(1) == indexed["proba"].argmax(1)).mean())
+
+            for row in (knn, indexed):
+                row.pop("proba")
+                row.update(rows=n, label_agreement=agreement)
+                results.append(row)
+                print(f"{n:>9} {row['engine']:>8}  fit {row['fit_s']:7.2f}s  "
+                      f"size {row['artifact_bytes'] / 1e6:8.2f}MB  load {row['load_s'] * 1e3:8.1f}ms "
+                      f"heap {row['load_heap_bytes'] / 1e6:8.2f}MB  single {row['single_row_ms']:6.3f}ms  "
+                      f"batch {row['batch_ms']:8.2f}ms  agree {agreement:.4f}")
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
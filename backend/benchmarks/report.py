@@ -0,0 +1,96 @@
+"""
+Shared helpers for the benchmark suite: run metadata, memory, JSON output and
+regression checks against a saved baseline.
+"""
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import time
+
+import numpy as np
+
+
+def environment():
+    """What produced a result file, so two files are only compared knowingly."""
+    import pandas
+    import sklearn
+
+    try:
+        rev = subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                             cwd=os.path.dirname(os.path.abspath(__file__))).stdout.strip() or None
+    except OSError:
+        rev = None
+    return {
+        "git_rev": rev,
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pandas.__version__,
+        "sklearn": sklearn.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+    }
+
+
+def rss_mb():
+    """Current resident set size (Linux), else the peak from getrusage."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+
+def latency_summary(samples_s):
+    ms = np.asarray(samples_s) * 1e3
+    return {
+        "p50_ms": float(np.percentile(ms, 50)),
+        "p99_ms": float(np.percentile(ms, 99)),
+        "mean_ms": float(ms.mean()),
+    }
+
+
+def _flatten(value, prefix=""):
+    if isinstance(value, dict):
+        for k, v in value.items():
+            yield from _flatten(v, f"{prefix}{k}.")
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        yield prefix[:-1], float(value)
+
+
+def compare(baseline, current, tolerance=0.2):
+    """
+    Returns the regressions of `current` against `baseline`: median latency
+    that grew, or throughput that shrank, by more than `tolerance`. p99 is
+    reported but not checked; it is too noisy on shared machines.
+    """
+    old = dict(_flatten(baseline.get("results", {})))
+    regressions = []
+    for key, value in _flatten(current.get("results", {})):
+        if key not in old or old[key] <= 0:
+            continue
+        ratio = value / old[key]
+        if (key.endswith("p50_ms") and ratio > 1 + tolerance) or (key.endswith("rps") and ratio < 1 - tolerance):
+            regressions.append({"metric": key, "baseline": old[key], "current": value, "ratio": ratio})
+    return regressions
+
+
+def finish(results, json_path=None, baseline_path=None, tolerance=0.2):
+    """Writes {"environment", "results"} and exits non-zero on a regression."""
+    output = {"environment": environment(), "results": results}
+    if json_path:
+        with open(json_path, "w") as f:
+            json.dump(output, f, indent=2)
+        print(f"Results written to {json_path}")
+    if baseline_path:
+        with open(baseline_path) as f:
+            regressions = compare(json.load(f), output, tolerance)
+        for r in regressions:
+            print(f"REGRESSION {r['metric']}: {r['baseline']:.3f} -> {r['current']:.3f} (x{r['ratio']:.2f})")
+        if regressions:
+            sys.exit(1)
+        print(f"No regressions beyond {tolerance:.0%} against {baseline_path}")
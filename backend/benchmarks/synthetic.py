@@ -0,0 +1,118 @@
+"""
+Synthetic inputs and model files for offline benchmarks.
+
+Writes a BTS delay-cause CSV and a flight_data_prices.csv with the real
+column schemas and seeded random values, then trains all three models with
+the production training code into one directory that main.py can serve
+via MODEL_DIR.
+
+    python benchmarks/synthetic.py /tmp/bench-models [--bts-rows 20000] [--price-rows 50000]
+"""
+import argparse
+import contextlib
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+sys.path.insert(0, os.path.join(BACKEND, "model"))
+
+CARRIERS = ["AA", "AS", "B6", "DL", "F9", "NK", "UA", "WN", "G4", "HA", "OO", "YX"]
+AIRPORTS = [f"A{i:02d}" for i in range(60)]
+AIRLINES = ["American Airlines", "Delta", "JetBlue", "Southwest", "United"]
+PRICE_AIRPORTS = ["ATL", "DEN", "DFW", "JFK", "LAX", "ORD", "SEA", "SFO"]
+STATUSES = ["Cancelled", "Delayed", "On-time"]
+
+BTS_CSV = "Airline_Delay_Cause (1).csv"
+PRICES_CSV = "flight_data_prices.csv"
+
+
+def write_bts_csv(path, n, seed=0):
+    """Monthly carrier x airport rows with the BTS column names train_modelbc expects."""
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({
+        "year": rng.integers(2004, 2024, n),
+        "month": rng.integers(1, 13, n),
+        "carrier": rng.choice(CARRIERS, n),
+        "carrier_name": "Synthetic Carrier",
+        "airport": rng.choice(AIRPORTS, n),
+        "airport_name": "Synthetic Airport",
+    })
+    flights = rng.integers(10, 3000, n)
+    delayed = (flights * rng.uniform(0.05, 0.4, n)).astype(int)
+    total_delay = delayed * rng.uniform(20, 80, n)
+    df["Number of arriving flights"] = flights
+    df["Number of flights delayed by 15 minutes or more"] = delayed
+    df["Weather count (delay due to weather)"] = delayed * rng.uniform(0, 0.2, n)
+    df["Total arrival delay"] = total_delay
+    df["Delay attributed to weather"] = total_delay * rng.uniform(0, 0.2, n)
+    df.to_csv(path, index=False)
+
+
+def write_prices_csv(path, n, seed=0):
+    """Rows shaped like dataset/flight_data_prices.csv."""
+    rng = np.random.default_rng(seed)
+    times = pd.Timestamp("2024-01-01") + pd.to_timedelta(rng.integers(0, 366 * 24 * 60, n), unit="min")
+    status = rng.choice(STATUSES, n, p=[0.05, 0.25, 0.7])
+    delay = np.where(status == "Delayed", rng.integers(1, 180, n), rng.integers(0, 3, n) * (rng.random(n) < 0.3))
+    pd.DataFrame({
+        "Airline": rng.choice(AIRLINES, n),
+        "Departure_Airport": rng.choice(PRICE_AIRPORTS, n),
+        "Arrival_Airport": rng.choice(PRICE_AIRPORTS, n),
+        "Departure_Time": [f"{t.day}/{t.month}/{t.year} {t.hour}:{t.minute:02d}" for t in times],
+        "Flight_Duration_Minutes": rng.integers(45, 400, n),
+        "Flight_Status": status,
+        "Price_USD": rng.uniform(50, 900, n).round(2),
+        "Delay_Minutes": delay,
+        "Weather_Impact": rng.integers(0, 2, n),
+    }).to_csv(path, index=False)
+
+
+@contextlib.contextmanager
+def _cwd(path):
+    previous = os.getcwd()
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous)
+
+
+def build_models(model_dir, bts_rows=20000, price_rows=50000, seed=0, n_estimators=200):
+    """Trains flight_model.pkl, delay_severity_model.pkl and simple_model.pkl into model_dir."""
+    import train_modelbc
+    from delay_severity_model import SimpleFlightDelayModel
+    from weather_delay_prediction_model import SimpleModel
+
+    os.makedirs(model_dir, exist_ok=True)
+    with _cwd(model_dir), contextlib.redirect_stdout(sys.stderr):
+        write_bts_csv(BTS_CSV, bts_rows, seed)
+        aggregates = train_modelbc.load_aggregates(BTS_CSV)
+        df_trainable = train_modelbc.trainable_from_aggregates(aggregates)
+        threshold = train_modelbc.label_trainable(df_trainable)
+        pipeline = train_modelbc.build_pipeline(n_estimators=n_estimators)
+        pipeline.fit(df_trainable.drop(columns=train_modelbc.TARGET_COLUMNS), df_trainable["HighWeatherImpact_Class"])
+        train_modelbc.save_package(pipeline, df_trainable, aggregates, threshold, precompute=False)
+
+        write_prices_csv(PRICES_CSV, price_rows, seed)
+        SimpleFlightDelayModel().train(dataset_path=PRICES_CSV)
+        SimpleModel().train()
+    return model_dir
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("model_dir")
+    parser.add_argument("--bts-rows", type=int, default=20000)
+    parser.add_argument("--price-rows", type=int, default=50000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    build_models(args.model_dir, args.bts_rows, args.price_rows, args.seed)
+    print(f"Synthetic models written to {args.model_dir}")
+
+
+if __name__ == "__main__":
+    main()
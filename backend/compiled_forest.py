@@ -0,0 +1,241 @@
+"""
+Chart 2 model as flat arrays: export/import for the array store.
+
+CompiledForestPipeline holds what the fitted sklearn Pipeline needs at
+predict time - StandardScaler mean/scale, OneHotEncoder category tables
+and every tree's node arrays concatenated - and answers predict_proba
+without sklearn. export_flight_model / load_flight_arrays move a whole
+flight_model.pkl package (model, avg_df, dropdown lists) to and from a
+single memory-mappable file. On the way back avg_df stays as its mapped
+columns ("avg") plus a route -> row lookup ("avg_slots"), which the
+registry serves through ArraySeasonalIndex without building a DataFrame.
+"""
+from array_store import read_arrays, write_arrays
+from lazy_imports import lazy_import
+from seasonal_index import route_slots
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+ARRAYS_FILE = "flight_model.arrays"
+
+_TREE_FIELDS = ("left", "right", "feature", "threshold", "value")
+
+
+# Rows scored per traversal pass; bounds the (trees x rows) index matrix
+BLOCK_ROWS = 256
+
+
+class CompiledForestPipeline:
+    """
+    Scaler + one-hot + RandomForest predict_proba over plain arrays.
+
+    Scaling and one-hot expansion are index math on arrays; all trees are
+    walked together, one depth level per step, with leaves pointing at
+    themselves so every lane can take the same number of steps. Output is
+    bit-identical to Pipeline.predict_proba.
+    """
+
+    # score_seasonal_batch may pass row dicts instead of a DataFrame
+    accepts_records = True
+
+    def __init__(self, arrays, meta):
+        self.arrays = arrays
+        self.num_columns = meta["num_columns"]
+        self.cat_columns = meta["cat_columns"]
+        self.depth = meta["depth"]
+        self.classes_ = arrays["classes"]
+
+        self.num_mean = arrays["num_mean"]
+        self.num_scale = arrays["num_scale"]
+        self.left = arrays["left"]
+        self.right = arrays["right"]
+        self.feature = arrays["feature"]
+        self.threshold = arrays["threshold"]
+        self.value = arrays["value"]
+        self.roots = arrays["roots"].astype(np.intp)
+        # children[2 * node] is the left child, children[2 * node + 1] the right one
+        self.children = np.stack([self.left, self.right], axis=1).ravel().astype(np.intp)
+        self.feature_ix = self.feature.astype(np.intp)
+
+        # One-hot: category value -> output column
+        self.n_features = len(self.num_columns)
+        self.onehot = []
+        for i, _ in enumerate(self.cat_columns):
+            categories = arrays[f"cat{i}"].tolist()
+            self.onehot.append({value: self.n_features + j for j, value in enumerate(categories)})
+            self.n_features += len(categories)
+
+    @classmethod
+    def from_pipeline(cls, pipeline):
+        preprocessor = pipeline.named_steps['preprocessor']
+        forest = pipeline.named_steps['classifier']
+        scaler = preprocessor.named_transformers_['num']
+        onehot = preprocessor.named_transformers_['cat']
+        num_columns = list(preprocessor.transformers_[0][2])
+        cat_columns = list(preprocessor.transformers_[1][2])
+
+        left, right, feature, threshold, value, roots = [], [], [], [], [], []
+        offset = 0
+        depth = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            leaf = tree.children_left == -1
+            nodes = np.arange(tree.node_count) + offset
+            roots.append(offset)
+            depth = max(depth, tree.max_depth)
+            # Child indices become global positions; leaves loop onto themselves
+            left.append(np.where(leaf, nodes, tree.children_left + offset))
+            right.append(np.where(leaf, nodes, tree.children_right + offset))
+            feature.append(np.where(leaf, 0, tree.feature))
+            threshold.append(tree.threshold)
+            # Same normalisation DecisionTreeClassifier.predict_proba applies
+            node_value = tree.value[:, 0, :].copy()
+            normalizer = node_value.sum(axis=1)[:, np.newaxis]
+            normalizer[normalizer == 0.0] = 1.0
+            value.append(node_value / normalizer)
+            offset += tree.node_count
+
+        arrays = {
+            "classes": forest.classes_,
+            "num_mean": scaler.mean_,
+            "num_scale": scaler.scale_,
+            "left": np.concatenate(left).astype(np.int32),
+            "right": np.concatenate(right).astype(np.int32),
+            "feature": np.concatenate(feature).astype(np.int32),
+            "threshold": np.concatenate(threshold),
+            "value": np.concatenate(value),
+            "roots": np.array(roots, dtype=np.int32),
+        }
+        for i, categories in enumerate(onehot.categories_):
+            arrays[f"cat{i}"] = _fixed_width(categories)
+        meta = {"num_columns": num_columns, "cat_columns": cat_columns, "depth": int(depth)}
+        return cls(arrays, meta)
+
+    def meta(self):
+        return {"num_columns": self.num_columns, "cat_columns": self.cat_columns, "depth": self.depth}
+
+    def _columns(self, X):
+        """Column name -> list of values, from a DataFrame or a list of row dicts."""
+        names = self.num_columns + self.cat_columns
+        if isinstance(X, list):
+            return {c: [row[c] for row in X] for c in names}
+        return {c: X[c].tolist() for c in names}
+
+    def transform(self, X):
+        """ColumnTransformer output: scaled numerics then one-hot blocks."""
+        columns = self._columns(X)
+        n = len(X)
+        out = np.zeros((n, self.n_features))
+        numeric = np.array([columns[c] for c in self.num_columns], dtype=np.float64).T.reshape(n, -1)
+        out[:, :len(self.num_columns)] = (numeric - self.num_mean) / self.num_scale
+        rows = np.arange(n)
+        for column, lookup in zip(self.cat_columns, self.onehot):
+            cols = np.fromiter((lookup.get(v, -1) for v in columns[column]), dtype=np.int64, count=n)
+            known = cols >= 0  # handle_unknown='ignore': all-zero block
+            out[rows[known], cols[known]] = 1.0
+        return out
+
+    def _leaves(self, X32):
+        """Leaf index reached in every tree: shape (n_trees, n_rows)."""
+        n_rows, n_features = X32.shape
+        flat = X32.ravel()
+        row_base = (np.arange(n_rows, dtype=np.intp) * n_features)[np.newaxis, :]
+        node = np.repeat(self.roots[:, np.newaxis], n_rows, axis=1)
+        for _ in range(self.depth):
+            x = flat.take(row_base + self.feature_ix.take(node))
+            go_right = ~(x <= self.threshold.take(node))
+            node = self.children.take(2 * node + go_right)
+        return node
+
+    def predict_proba(self, X):
+        # Trees compare float32 features against float64 thresholds, like sklearn
+        X32 = self.transform(X).astype(np.float32)
+        proba = np.empty((len(X32), len(self.classes_)))
+        for start in range(0, len(X32), BLOCK_ROWS):
+            block = X32[start:start + BLOCK_ROWS]
+            # Reducing over axis 0 adds tree by tree in order, as the forest does
+            proba[start:start + BLOCK_ROWS] = self.value[self._leaves(block)].sum(axis=0)
+        return proba / len(self.roots)
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+
+def _fixed_width(values):
+    values = np.asarray(values)
+    return values.astype(str) if values.dtype.hasobject else values
+
+
+# -------------------------------------------------------
+# EXPORT / IMPORT OF THE WHOLE CHART 2 PACKAGE
+# -------------------------------------------------------
+def export_flight_model(pkg, path):
+    """Writes a flight_model.pkl package to one memory-mappable array file."""
+    compiled = CompiledForestPipeline.from_pipeline(pkg["pipeline"])
+    avg_df = pkg["avg_df"]
+    carriers = list(pkg["carriers"])
+    airports = list(pkg["airports"])
+
+    arrays = {f"model/{name}": a for name, a in compiled.arrays.items()}
+    arrays["carriers"] = _fixed_width(carriers)
+    arrays["airports"] = _fixed_width(airports)
+    numeric = [c for c in avg_df.columns if c not in ("carrier", "airport")]
+    arrays["avg/carrier"] = pd.Categorical(avg_df["carrier"], categories=carriers).codes.astype(np.int32)
+    arrays["avg/airport"] = pd.Categorical(avg_df["airport"], categories=airports).codes.astype(np.int32)
+    for column in numeric:
+        arrays[f"avg/{column}"] = avg_df[column].to_numpy()
+    arrays["avg_slots"] = route_slots(
+        arrays["avg/carrier"], arrays["avg/airport"], avg_df["month"].to_numpy(), len(carriers), len(airports)
+    )
+
+    meta = {
+        "model": compiled.meta(),
+        "avg_columns": list(avg_df.columns),
+        "threshold": float(pkg["threshold"]),
+        "build_id": pkg.get("build_id"),
+        "profile": pkg.get("profile"),
+    }
+    write_arrays(path, arrays, meta)
+
+
+def load_flight_arrays(path):
+    """
+    Inverse of export_flight_model: a package shaped like flight_model.pkl,
+    except that avg_df comes back as "avg" - column name -> mapped array,
+    carrier / airport coded by their position in "carriers" / "airports" -
+    and "avg_slots" (see route_slots; None in files written before it).
+    """
+    arrays, meta = read_arrays(path)
+    model_arrays = {name[len("model/"):]: a for name, a in arrays.items() if name.startswith("model/")}
+    avg = {column: arrays[f"avg/{column}"] for column in meta["avg_columns"]}
+
+    return {
+        "pipeline": CompiledForestPipeline(model_arrays, meta["model"]),
+        "avg": avg,
+        "avg_slots": arrays.get("avg_slots"),
+        "threshold": meta["threshold"],
+        "carriers": arrays["carriers"].tolist(),
+        "airports": arrays["airports"].tolist(),
+        "build_id": meta["build_id"],
+        "profile": meta.get("profile"),
+    }
+
+
+def avg_frame(pkg):
+    """avg_df of a package from load_flight_arrays, as a DataFrame (for tools, not the server)."""
+    avg = dict(pkg["avg"])
+    avg["carrier"] = np.asarray(pkg["carriers"], dtype=object)[avg["carrier"]]
+    avg["airport"] = np.asarray(pkg["airports"], dtype=object)[avg["airport"]]
+    return pd.DataFrame(avg, columns=list(pkg["avg"]))
+
+if __name__ == "__main__":
+    import argparse
+    import joblib
+
+    parser = argparse.ArgumentParser(description="Export flight_model.pkl to the flat array format.")
+    parser.add_argument("source", nargs="?", default="flight_model.pkl")
+    parser.add_argument("target", nargs="?", default=ARRAYS_FILE)
+    args = parser.parse_args()
+    export_flight_model(joblib.load(args.source), args.target)
+    print(f"✅ Wrote {args.target}")
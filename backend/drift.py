@@ -0,0 +1,164 @@
+"""
+Input and prediction drift against the profile saved at training time.
+
+Live traffic is tallied into two counters in metrics.py: inputs by
+(chart, feature, value) and predictions by (chart, class). Categorical
+features only ever use training classes as values, plus UNSEEN for anything
+else, and numeric features are binned (hour 0-23, month 1-12). The label
+sets are therefore bounded by the training data however long the server
+runs. A batch costs one bincount / Counter pass and one add per distinct
+value. Because they are plain counters, the tallies are merged across
+workers like every other metric (METRICS_DIR).
+
+Training stores the same shape of tally as bundle["profile"]:
+
+    {"features": {feature: {value: count}}, "predictions": {class: count}}
+
+and /drift compares the two with the population stability index (PSI) per
+feature. The trainers also write it to a small JSON sidecar next to the
+model (PROFILE_FILES), so a process that never loads the model - the parent
+of the process executor - still has the reference.
+"""
+import collections
+import json
+import math
+import os
+
+from lazy_imports import lazy_import
+from metrics import DRIFT_INPUTS, DRIFT_PREDICTIONS, totals
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+UNSEEN = "__unseen__"
+# Registry model name -> training profile sidecar, written next to the model file
+PROFILE_FILES = {"flight": "flight_profile.json", "severity": "delay_severity_profile.json"}
+# PSI above this is reported as drift (0.1-0.25 is the usual "watch" band)
+PSI_ALERT = float(os.environ.get("DRIFT_PSI_ALERT", "0.2"))
+# Share given to a value missing on one side, so PSI stays finite
+EPSILON = 1e-4
+# Largest per-value share changes listed per feature
+TOP_SHIFTS = 5
+# Up to this many codes a Counter beats bincount's NumPy overhead
+SMALL_BATCH = 32
+
+
+# -------------------------------------------------------
+# LIVE TALLIES
+# -------------------------------------------------------
+def observe_values(chart, feature, values, known=None):
+    """Counts label values; anything not in `known` (when given) counts as UNSEEN."""
+    counts = collections.Counter(values)
+    for value, count in counts.items():
+        label = str(value) if known is None or value in known else UNSEEN
+        DRIFT_INPUTS.inc(chart, feature, label, amount=count)
+
+
+def observe_codes(chart, feature, classes, codes):
+    """Counts encoded values; negative codes (unseen labels) count as UNSEEN."""
+    if len(codes) <= SMALL_BATCH:
+        counts = collections.Counter(codes.tolist() if hasattr(codes, "tolist") else codes)
+        for code, count in counts.items():
+            DRIFT_INPUTS.inc(chart, feature, str(classes[code]) if code >= 0 else UNSEEN, amount=count)
+        return
+    codes = np.asarray(codes)
+    unseen = int((codes < 0).sum())
+    counts = np.bincount(codes[codes >= 0], minlength=len(classes))
+    for code in np.flatnonzero(counts).tolist():
+        DRIFT_INPUTS.inc(chart, feature, str(classes[code]), amount=int(counts[code]))
+    if unseen:
+        DRIFT_INPUTS.inc(chart, feature, UNSEEN, amount=unseen)
+
+
+def observe_predictions(chart, labels):
+    for label, count in collections.Counter(labels).items():
+        DRIFT_PREDICTIONS.inc(chart, str(label), amount=count)
+
+
+def live_profile(chart):
+    """This chart's tallies from every worker, shaped like a training profile."""
+    features = {}
+    for (c, feature, value), count in totals(DRIFT_INPUTS).items():
+        if c == chart:
+            features.setdefault(feature, {})[value] = count
+    predictions = {cls: count for (c, cls), count in totals(DRIFT_PREDICTIONS).items() if c == chart}
+    return {"features": features, "predictions": predictions}
+
+
+# -------------------------------------------------------
+# TRAINING PROFILE
+# -------------------------------------------------------
+def _tally(values, weights=None):
+    values = pd.Series(values).astype(str)
+    if weights is None:
+        counts = values.value_counts()
+    else:
+        counts = pd.Series(np.asarray(weights, dtype=np.float64), index=values.to_numpy()).groupby(level=0).sum()
+    return {str(k): float(v) for k, v in counts.items()}
+
+
+def training_profile(features, predictions, weights=None):
+    """
+    `features` maps feature name -> training values, `predictions` holds the
+    training labels; `weights` (optional) counts each row that many times.
+    """
+    return {
+        "features": {name: _tally(values, weights) for name, values in features.items()},
+        "predictions": _tally(predictions, weights),
+    }
+
+
+def write_profile(profile, path):
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump(profile, f)
+    os.replace(tmp_path, path)
+
+
+# -------------------------------------------------------
+# COMPARISON
+# -------------------------------------------------------
+def _shares(counts):
+    total = sum(counts.values())
+    return {k: v / total for k, v in counts.items()} if total else {}
+
+
+def psi(reference, live):
+    """Population stability index of two {value: count} tallies (None if either is empty)."""
+    ref, cur = _shares(reference), _shares(live)
+    if not ref or not cur:
+        return None
+    return sum(
+        (max(cur.get(k, 0.0), EPSILON) - max(ref.get(k, 0.0), EPSILON))
+        * math.log(max(cur.get(k, 0.0), EPSILON) / max(ref.get(k, 0.0), EPSILON))
+        for k in ref.keys() | cur.keys()
+    )
+
+
+def _compare_tally(reference, live):
+    ref, cur = _shares(reference or {}), _shares(live)
+    value = psi(reference or {}, live)
+    shifts = sorted(ref.keys() | cur.keys(), key=lambda k: abs(cur.get(k, 0.0) - ref.get(k, 0.0)), reverse=True)
+    return {
+        "live_count": int(sum(live.values())),
+        "unseen_rate": cur.get(UNSEEN, 0.0),
+        "psi": value,
+        "drift": value is not None and value > PSI_ALERT,
+        "largest_shifts": [
+            {"value": k, "reference_share": ref.get(k, 0.0), "live_share": cur.get(k, 0.0)}
+            for k in shifts[:TOP_SHIFTS]
+        ],
+    }
+
+
+def compare(reference, live):
+    """Per-feature and prediction drift of a live profile against a training one (or None)."""
+    reference = reference or {"features": {}, "predictions": {}}
+    return {
+        "has_reference": bool(reference["features"]),
+        "features": {
+            name: _compare_tally(reference["features"].get(name), counts)
+            for name, counts in sorted(live["features"].items())
+        },
+        "predictions": _compare_tally(reference["predictions"], live["predictions"]),
+    }
@@ -0,0 +1,70 @@
+"""
+Chart 3 label encoders compiled into lookup tables.
+
+A fitted LabelEncoder answers transform() with np.unique + searchsorted and
+raises ValueError on unseen labels. EncodingTable produces the same codes
+from a dict (one value) or a prebuilt pandas Index (a batch), and reports
+unseen labels as a code instead: the configured fallback, or None/UNKNOWN
+when there is none, so callers decide what an unknown value means.
+Used by the server (registry) and SimpleFlightDelayModel.predict.
+"""
+from lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+# Batch code for an unseen label when the table has no fallback
+UNKNOWN = -1
+# Up to this many values, dict lookups beat building a pandas Index
+DICT_MAX = 32
+
+
+class EncodingTable:
+    def __init__(self, classes, unknown=None):
+        self.classes = tuple(str(c) for c in classes)
+        self.codes = {c: i for i, c in enumerate(self.classes)}
+        if unknown is not None and not 0 <= unknown < len(self.classes):
+            raise ValueError(f"Fallback code {unknown} is outside 0..{len(self.classes) - 1}")
+        self.unknown = unknown
+        self._index = None
+
+    @classmethod
+    def from_label_encoder(cls, encoder, unknown=None):
+        return cls(encoder.classes_, unknown)
+
+    def code(self, value):
+        """One value -> its code, the fallback code, or None if unseen without a fallback."""
+        return self.codes.get(value, self.unknown) if isinstance(value, str) else self.unknown
+
+    def encode(self, values, fallback=True):
+        """
+        Many values -> int64 codes; unseen ones get the fallback, else UNKNOWN.
+        fallback=False always reports them as UNKNOWN (see fill_unknown).
+        """
+        if len(values) <= DICT_MAX:
+            missing = UNKNOWN if self.unknown is None or not fallback else self.unknown
+            return np.array(
+                [self.codes.get(v, missing) if isinstance(v, str) else missing for v in values], dtype=np.int64
+            )
+        if self._index is None:
+            self._index = pd.Index(self.classes, dtype=object)
+        # Request values are unchecked JSON: anything but a str (a list, a dict...) is unseen
+        values = [v if isinstance(v, str) else None for v in values]
+        codes = self._index.get_indexer(pd.Index(values, dtype=object))
+        return self.fill_unknown(codes) if fallback else codes
+
+    def fill_unknown(self, codes):
+        """Swaps UNKNOWN codes for the fallback code, when there is one."""
+        if self.unknown is None:
+            return codes
+        return np.where(codes == UNKNOWN, self.unknown, codes)
+
+
+def compile_encoders(encoders, unknown=None):
+    """
+    {name: LabelEncoder} -> {name: EncodingTable}. `unknown` is one fallback
+    code for every table, or a {name: code} dict; None rejects unseen labels.
+    """
+    if not isinstance(unknown, dict):
+        unknown = {name: unknown for name in encoders}
+    return {name: EncodingTable.from_label_encoder(enc, unknown.get(name)) for name, enc in encoders.items()}
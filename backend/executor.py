@@ -0,0 +1,77 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+
+class QueueFull(Exception):
+    """Every inference slot is taken; the caller should answer 503."""
+
+
+def _run_timed(fn, args, submitted):
+    # Wall clock, so the wait is measurable from inside a worker process too
+    started = time.time()
+    return started - submitted, fn(*args)
+
+
+class InferenceExecutor:
+    """
+    Runs blocking model work off the event loop on a bounded pool.
+
+    At most `max_pending` calls may be queued or running at once; past that
+    run() raises QueueFull immediately instead of letting requests pile up.
+    run() is only ever awaited from the event loop thread, so the counters
+    need no lock.
+    """
+
+    def __init__(self, kind="thread", workers=None, max_pending=64, initializer=None, initargs=()):
+        self.kind = kind
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending
+        if kind == "process":
+            # spawn: never fork a parent that already runs watcher threads
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers, mp_context=multiprocessing.get_context("spawn"),
+                initializer=initializer, initargs=initargs,
+            )
+        else:
+            self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="inference")
+
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    async def run(self, fn, *args):
+        if self.pending >= self.max_pending:
+            self.rejected += 1
+            raise QueueFull()
+
+        self.pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            wait, result = await loop.run_in_executor(self._pool, _run_timed, fn, args, time.time())
+        finally:
+            self.pending -= 1
+
+        self.completed += 1
+        self.wait_total += wait
+        self.wait_max = max(self.wait_max, wait)
+        return result
+
+    def stats(self):
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "queue_depth": self.pending,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "avg_wait_ms": self.wait_total / self.completed * 1e3 if self.completed else 0.0,
+            "max_wait_ms": self.wait_max * 1e3,
+        }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,312 @@
+import logging
+import time
+
+import drift
+from encoding import UNKNOWN
+from lazy_imports import lazy_import
+from logs import Lazy, get_logger, log
+from metrics import STAGE_SECONDS
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+logger = get_logger("inference")
+
+# Up to this many rows the NumPy forest beats sklearn's Cython trees; past it,
+# the fitted Pipeline is used when the bundle still has one
+COMPILED_MAX_ROWS = 2048
+
+# Columns of avg_df the Chart 2 pipeline must not see
+TARGET_COLUMNS = ['HighWeatherImpact_Class', 'WeatherDelayProportion']
+
+# Chart 3 request field -> (encoder name, encoded feature column)
+SEVERITY_FIELDS = [
+    ("Airline", "airline", "Airline_Encoded"),
+    ("Departure_Airport", "departure", "Departure_Encoded"),
+    ("Arrival_Airport", "arrival", "Arrival_Encoded"),
+    ("Flight_Status", "status", "Status_Encoded"),
+]
+DELAY_MAP = {"No Delay": 0, "Minor": 15, "Major": 60}
+# Drift bins for the numeric inputs
+HOURS = [str(h) for h in range(24)]
+MONTHS = [str(m) for m in range(1, 13)]
+
+
+class ItemError(Exception):
+    """A single payload in a batch could not be scored."""
+
+    def __init__(self, message, status=400):
+        super().__init__(message)
+        self.status = status
+
+    def __reduce__(self):
+        # Keep the status when results cross a process-pool boundary
+        return (ItemError, (str(self), self.status))
+
+
+def get_yearly_trend(carrier, airport, index):
+    """Generates 12-month trend data for the Seasonal Chart."""
+    if index is None: return []
+    return index.yearly_trend(carrier, airport)
+
+def get_competitor_analysis(current_carrier, airport, month, index):
+    """Finds comparison data for the Radar Chart (3 lowest-risk other carriers)."""
+    if index is None: return []
+    return index.competitor_analysis(current_carrier, airport, month)
+
+
+# --- CHART 2 (Seasonal Risk) ---
+
+def _seasonal_key(item):
+    try:
+        return str(item['carrier']), str(item['airport']), int(item['month'])
+    except KeyError as e:
+        raise ItemError(f"Missing field: {e.args[0]}")
+    except (TypeError, ValueError):
+        raise ItemError(f"Invalid month: {item.get('month')!r}")
+
+
+def score_seasonal_batch(pkg, items, cache=None):
+    """
+    Scores many Chart 2 payloads with one predict_proba call.
+    Returns one entry per item: a response dict or an ItemError.
+    Keys already in `cache` or in the precomputed table skip the model entirely.
+    """
+    results = _score_seasonal(pkg, items, cache)
+    _observe_seasonal(pkg, items, results)
+    return results
+
+
+def _observe_seasonal(pkg, items, results):
+    scored = [(item, r) for item, r in zip(items, results) if isinstance(r, dict)]
+    if not scored:
+        return
+    cube = pkg["cube"]
+    drift.observe_values("seasonal", "carrier", [str(item["carrier"]) for item, _ in scored], cube.carrier_codes)
+    drift.observe_values("seasonal", "airport", [str(item["airport"]) for item, _ in scored], cube.airport_codes)
+    months = [int(item["month"]) for item, _ in scored]
+    drift.observe_codes("seasonal", "month", MONTHS, [m - 1 if 1 <= m <= 12 else -1 for m in months])
+    drift.observe_predictions("seasonal", [r["risk_class"] for _, r in scored])
+
+
+def _score_seasonal(pkg, items, cache):
+    index = pkg["index"]
+    threshold = float(pkg["threshold"])
+    version = pkg.get("version")
+
+    results = [None] * len(items)
+    keys, positions = [], []
+    for i, item in enumerate(items):
+        try:
+            key = _seasonal_key(item)
+        except ItemError as e:
+            results[i] = e
+            continue
+        hit = cache.get(("seasonal", version, key)) if cache is not None else None
+        if hit is not None:
+            results[i] = hit
+            continue
+        # Precomputed at training time: no sklearn on the request path
+        precomputed = index.prediction(*key)
+        if precomputed is not None:
+            risk_class, confidence = precomputed
+            results[i] = _seasonal_result(
+                risk_class, confidence, index.row(*key)['WeatherDelayProportion'], threshold, index, key
+            )
+            continue
+        keys.append(key)
+        positions.append(i)
+    if not keys:
+        return results
+
+    # 1. Exact historical match per key; unseen routes fall back to the average row
+    with STAGE_SECONDS.time("seasonal", "avg_df_lookup"):
+        rows = [index.row(*key) or index.fallback_row(*key) for key in keys]
+
+    # 2. One probability pass; labels come from the argmax
+    pipeline = pkg["pipeline"]
+    if pkg.get("compiled") is not None and len(keys) <= COMPILED_MAX_ROWS:
+        pipeline = pkg["compiled"]
+    if getattr(pipeline, "accepts_records", False):
+        model_input = rows
+    else:
+        model_input = pd.DataFrame(rows).drop(columns=TARGET_COLUMNS, errors='ignore')
+    try:
+        with STAGE_SECONDS.time("seasonal", "predict_proba"):
+            probs = pipeline.predict_proba(model_input)
+        preds = pipeline.classes_[probs.argmax(axis=1)]
+        high_idx = list(pipeline.classes_).index(1)
+    except Exception as e:
+        logger.error("Chart 2 prediction error, answering 0.5: %s", e)
+        probs = np.full((len(keys), 2), 0.5)
+        preds = np.zeros(len(keys), dtype=int)
+        high_idx = 1
+
+    for j, key in enumerate(keys):
+        result = _seasonal_result(
+            preds[j], probs[j, high_idx], rows[j].get('WeatherDelayProportion', 0), threshold, index, key
+        )
+        results[positions[j]] = result
+        if cache is not None:
+            cache.put(("seasonal", version, key), result)
+    return results
+
+
+def _seasonal_result(pred, confidence, weather_prop, threshold, index, key):
+    carrier, airport, month = key
+    pred = int(pred)
+    with STAGE_SECONDS.time("seasonal", "yearly_trend"):
+        trend = get_yearly_trend(carrier, airport, index)
+    with STAGE_SECONDS.time("seasonal", "competitor_analysis"):
+        competitors = get_competitor_analysis(carrier, airport, month, index)
+    return {
+        "risk_level": "HIGH RISK" if pred == 1 else "LOW RISK",
+        "risk_class": pred,
+        "confidence_high_risk": float(confidence),
+        "historical_weather_prop": float(weather_prop),
+        "threshold": threshold,
+        "trend_data": trend,
+        "competitors": competitors,
+    }
+
+
+# --- CHART 3 (Severity) ---
+
+def encode_severity(bundle, columns, n, observe=False):
+    """
+    Column-wise Chart 3 encoding, shared by request scoring and bulk jobs.
+    `columns` maps each request field to n raw values (None = missing).
+    Returns (X, ok, errors): X holds the valid rows in feature_order, ok
+    marks them among the n inputs, errors maps input row -> first problem.
+    observe=True also tallies the inputs for drift monitoring.
+    """
+    tables = bundle["tables"]
+    feature_order = list(bundle["feature_order"])
+    ok = np.ones(n, dtype=bool)
+    errors = {}
+
+    def fail(i, message):
+        if ok[i]:
+            errors[i] = message
+            ok[i] = False
+
+    def column(field):
+        values = columns.get(field)
+        if values is None:
+            values = [None] * n
+        for i, value in enumerate(values):
+            if value is None:
+                fail(i, f"Missing field: {field}")
+        return values
+
+    encode_start = time.perf_counter()
+
+    # Parse every timestamp at once
+    raw_times = column("Departure_Time")
+    dt = pd.to_datetime(pd.Series(raw_times, dtype=object), format="%d/%m/%Y %H:%M", errors="coerce")
+    for i in np.flatnonzero(dt.isna().to_numpy()):
+        fail(i, f"Invalid Departure_Time format. Received: {raw_times[i]}")
+
+    # One hash lookup per value; unseen labels come back as UNKNOWN unless a fallback is set
+    codes = {}
+    for field, enc_name, _ in SEVERITY_FIELDS:
+        values = column(field)
+        table = tables[enc_name]
+        raw = table.encode(values, fallback=False)
+        if observe:
+            # Before the fallback swap, so unseen labels are tallied as unseen
+            present = np.array([value is not None for value in values], dtype=bool)
+            drift.observe_codes("severity", field, table.classes, raw[present])
+        codes[field] = table.fill_unknown(raw)
+        for i in np.flatnonzero(codes[field] == UNKNOWN):
+            fail(i, f"Value not found in training data: {field}={values[i]!r}")
+
+    dt = dt[ok]
+    features = {
+        "Dep_Hour": dt.dt.hour.to_numpy(),
+        "Dep_Day": dt.dt.day.to_numpy(),
+        "Dep_Month": dt.dt.month.to_numpy(),
+        "Dep_Weekday": dt.dt.dayofweek.to_numpy(),
+    }
+    for field, enc_name, column_name in SEVERITY_FIELDS:
+        features[column_name] = codes[field][ok]
+    if observe:
+        drift.observe_codes("severity", "Dep_Hour", HOURS, features["Dep_Hour"])
+        drift.observe_codes("severity", "Dep_Month", MONTHS, features["Dep_Month"] - 1)
+
+    X = pd.DataFrame(features)[feature_order]
+    STAGE_SECONDS.observe(time.perf_counter() - encode_start, "severity", "encoding")
+    log(logger, logging.DEBUG, "severity features", rows=len(X), X=Lazy(lambda: X.to_numpy().tolist()))
+    return X, ok, errors
+
+
+def observe_severity_labels(bundle, item):
+    """Drift tallies of one Chart 3 payload rejected before scoring (unseen labels included)."""
+    tables = bundle["tables"]
+    for field, enc_name, _ in SEVERITY_FIELDS:
+        value = item.get(field)
+        if value is not None:
+            drift.observe_codes("severity", field, tables[enc_name].classes,
+                                tables[enc_name].encode([value], fallback=False))
+
+
+def score_severity_batch(bundle, items, cache=None):
+    """
+    Scores many Chart 3 payloads with one scaler pass and one predict_proba call.
+    Returns one entry per item: a response dict or an ItemError.
+    Encoded feature rows already in `cache` skip the scaler and model.
+    """
+    results = _score_severity(bundle, items, cache)
+    drift.observe_predictions("severity", [r["predicted_severity"] for r in results if isinstance(r, dict)])
+    return results
+
+
+def _score_severity(bundle, items, cache):
+    model = bundle["model"]
+    scaler = bundle["scaler"]
+
+    n = len(items)
+    results = [None] * n
+    fields = ["Departure_Time"] + [field for field, _, _ in SEVERITY_FIELDS]
+    X, ok, errors = encode_severity(bundle, {f: [item.get(f) for item in items] for f in fields}, n, observe=True)
+    for i, message in errors.items():
+        results[i] = ItemError(message)
+    if not ok.any():
+        return results
+
+    version = bundle.get("version")
+    row_keys = [("severity", version, tuple(row)) for row in X.to_numpy().tolist()]
+
+    misses = []
+    for j, i in enumerate(np.flatnonzero(ok)):
+        hit = cache.get(row_keys[j]) if cache is not None else None
+        if hit is not None:
+            results[i] = hit
+        else:
+            misses.append((j, i))
+    if not misses:
+        return results
+
+    rows = [j for j, _ in misses]
+    with STAGE_SECONDS.time("severity", "scaling"):
+        X_scaled = scaler.transform(X.iloc[rows])
+    with STAGE_SECONDS.time("severity", "predict_proba"):
+        probs = model.predict_proba(X_scaled)
+    classes = model.classes_
+    best = probs.argmax(axis=1)
+
+    for k, (j, i) in enumerate(misses):
+        prediction = str(classes[best[k]])
+        result = {
+            "predicted_severity": prediction,
+            "estimated_delay_minutes": DELAY_MAP.get(prediction, 0),
+            "severity_confidence": float(probs[k, best[k]]),
+            "all_probabilities": {
+                str(cls): float(prob)
+                for cls, prob in zip(classes, probs[k])
+            }
+        }
+        results[i] = result
+        if cache is not None:
+            cache.put(row_keys[j], result)
+    return results
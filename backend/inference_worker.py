@@ -0,0 +1,62 @@
+"""
+Scoring entry points shared by both inference executors.
+
+With INFERENCE_EXECUTOR=thread, main.py calls score_with() on its own
+registry and cache. With INFERENCE_EXECUTOR=process, each spawned worker
+imports only this module, which must stay free of import-time side effects
+(no app, no executor, no job pool). init() then gives that process its own
+registry, cache and metrics exporter. Its cache stats, drift tallies and
+stage timings reach the parent's /metrics, /drift and /cache/stats through
+METRICS_DIR.
+"""
+from cache import PredictionCache
+from inference import ItemError, score_seasonal_batch, score_severity_batch
+from logs import configure_logging
+from metrics import CACHE_EVENTS, CACHE_SIZE, add_collector, set_metrics_dir, start_exporter
+from registry import ModelRegistry
+
+# kind -> (registry name, batch scorer)
+SCORERS = {
+    "seasonal": ("flight", score_seasonal_batch),
+    "severity": ("severity", score_severity_batch),
+}
+
+_registry = None
+_cache = None
+
+
+def score_with(registry, cache, kind, items):
+    """Runs on the inference executor, never on the event loop."""
+    model_name, scorer = SCORERS[kind]
+    pkg = registry.ensure(model_name)
+    if pkg is None:
+        return [ItemError(f"{model_name} model not loaded", status=503)] * len(items)
+    return scorer(pkg, items, cache)
+
+
+def collect_cache_stats(cache):
+    stats = cache.stats()
+    for outcome in ("hits", "misses", "evictions", "expirations"):
+        CACHE_EVENTS.set_total(stats[outcome], outcome)
+    CACHE_SIZE.set(stats["size"])
+
+
+# -------------------------------------------------------
+# PROCESS EXECUTOR
+# -------------------------------------------------------
+def init(model_dir, metrics_dir, cache_size, cache_ttl, reload_interval):
+    """Pool initializer: loads and watches this worker's models."""
+    global _registry, _cache
+    configure_logging()
+    set_metrics_dir(metrics_dir)
+    _registry = ModelRegistry(model_dir)
+    _registry.defer(["simple"])
+    _registry.load_all()
+    _registry.start_watcher(reload_interval)
+    _cache = PredictionCache(maxsize=cache_size, ttl=cache_ttl)
+    add_collector(lambda: collect_cache_stats(_cache))
+    start_exporter()
+
+
+def score(kind, items):
+    return score_with(_registry, _cache, kind, items)
@@ -0,0 +1,194 @@
+"""
+Bulk Chart 3 scoring jobs for whole schedule CSVs.
+
+The upload is streamed to disk, then a background thread reads it back in
+fixed-size chunks (pandas chunked reader), scores each chunk with one
+vectorized encode / scale / predict_proba pass and appends the rows to the
+output CSV, so memory depends on the chunk size, not the file size. Job
+state lives in <job_dir>/<id>.json, rewritten after each chunk, so any
+worker process can answer a progress poll.
+
+Jobs run on their own small thread pool, never on the inference executor,
+so a large file cannot starve /predict of workers. A job whose process
+shuts down (or dies) before it finishes ends up "interrupted", never stuck
+in "running".
+"""
+import csv
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from inference import DELAY_MAP, SEVERITY_FIELDS, encode_severity
+from lazy_imports import lazy_import
+from logs import get_logger
+from procs import pid_alive
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+logger = get_logger("jobs")
+
+INPUT_COLUMNS = ["Departure_Time"] + [field for field, _, _ in SEVERITY_FIELDS]
+ACTIVE_STATES = ("queued", "running")
+
+
+class JobInterrupted(Exception):
+    pass
+
+
+class BulkJobs:
+    def __init__(self, job_dir, registry, chunksize=50000, workers=1):
+        self.job_dir = job_dir
+        self.registry = registry
+        self.chunksize = chunksize
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="bulk-job")
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._active = {}  # job id -> job dict, queued or running in this process
+        os.makedirs(job_dir, exist_ok=True)
+
+    def _path(self, job_id, suffix):
+        return os.path.join(self.job_dir, f"{job_id}{suffix}")
+
+    def _save(self, job):
+        path = self._path(job["id"], ".json")
+        with self._lock:
+            with open(path + ".tmp", "w") as f:
+                json.dump(job, f)
+            os.replace(path + ".tmp", path)
+
+    # -------------------------------------------------------
+    # API
+    # -------------------------------------------------------
+    def new_upload(self):
+        """Returns (job_id, path to stream the uploaded CSV into)."""
+        job_id = uuid.uuid4().hex
+        return job_id, self._path(job_id, ".input.csv")
+
+    def submit(self, job_id):
+        input_path = self._path(job_id, ".input.csv")
+        job = {
+            "id": job_id,
+            "state": "queued",
+            "pid": os.getpid(),
+            "input_bytes": os.path.getsize(input_path),
+            "bytes_read": 0,
+            "rows_scored": 0,
+            "rows_failed": 0,
+            "progress": 0.0,
+            "created": time.time(),
+            "started": None,
+            "finished": None,
+            "error": None,
+        }
+        self._save(job)
+        self._active[job_id] = job
+        self._pool.submit(self._run, job)
+        # The worker thread keeps updating `job`
+        return dict(job)
+
+    def get(self, job_id):
+        # Only ever hex ids: never let a path through
+        if not job_id.isalnum():
+            return None
+        try:
+            with open(self._path(job_id, ".json")) as f:
+                job = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if job["state"] in ACTIVE_STATES and not pid_alive(job["pid"]):
+            # Its process was killed before it could record the interruption
+            job.update(state="interrupted", error="server process exited before the job finished")
+            self._save(job)
+        return job
+
+    def result_path(self, job_id):
+        return self._path(job_id, ".output.csv")
+
+    def shutdown(self):
+        """Stops running jobs after their current chunk; queued ones never start."""
+        self._stop.set()
+        self._pool.shutdown(wait=False, cancel_futures=True)
+        for job in list(self._active.values()):
+            if job["state"] == "queued":
+                self._interrupt(job)
+
+    def _interrupt(self, job):
+        job.update(state="interrupted", error="server shut down before the job finished", finished=time.time())
+        self._save(job)
+
+    # -------------------------------------------------------
+    # WORKER
+    # -------------------------------------------------------
+    def _run(self, job):
+        input_path = self._path(job["id"], ".input.csv")
+        output_path = self.result_path(job["id"])
+        job.update(state="running", started=time.time())
+        self._save(job)
+        try:
+            header = pd.read_csv(input_path, nrows=0, dtype=str).columns
+            missing = [c for c in INPUT_COLUMNS if c not in header]
+            if missing:
+                raise ValueError(f"CSV is missing required columns: {', '.join(missing)}")
+            bundle = self.registry.ensure("severity")
+            if bundle is None:
+                raise RuntimeError("severity model not loaded")
+            classes = [str(c) for c in bundle["model"].classes_]
+
+            with open(input_path, "rb") as raw, open(output_path + ".tmp", "w", newline="") as out:
+                writer = csv.writer(out)
+                writer.writerow(["row", "predicted_severity", "estimated_delay_minutes", "severity_confidence"]
+                                + [f"prob_{c}" for c in classes] + ["error"])
+                # Everything as text: the encoders see exactly what a /predict caller would send
+                reader = pd.read_csv(raw, chunksize=self.chunksize, dtype=str, keep_default_na=False,
+                                     usecols=INPUT_COLUMNS)
+                first_row = 0
+                for chunk in reader:
+                    if self._stop.is_set():
+                        raise JobInterrupted()
+                    failed = self._score_chunk(bundle, classes, chunk, first_row, writer)
+                    out.flush()
+                    first_row += len(chunk)
+                    job.update(
+                        bytes_read=raw.tell(), rows_scored=first_row, rows_failed=job["rows_failed"] + failed,
+                        progress=raw.tell() / job["input_bytes"] if job["input_bytes"] else 1.0,
+                    )
+                    self._save(job)
+            os.replace(output_path + ".tmp", output_path)
+            job.update(state="done", progress=1.0)
+        except JobInterrupted:
+            job.update(state="interrupted", error="server shut down before the job finished")
+        except Exception as e:
+            logger.exception("bulk job %s failed", job["id"])
+            job.update(state="failed", error=str(e))
+        finally:
+            job["finished"] = time.time()
+            self._save(job)
+            self._active.pop(job["id"], None)
+            for path in (input_path, output_path + ".tmp"):
+                if os.path.exists(path):
+                    os.remove(path)
+
+    def _score_chunk(self, bundle, classes, chunk, first_row, writer):
+        """Scores one chunk and appends its rows; returns how many rows failed."""
+        n = len(chunk)
+        columns = {c: chunk[c].tolist() for c in INPUT_COLUMNS if c in chunk.columns}
+        X, ok, errors = encode_severity(bundle, columns, n)
+
+        labels = np.full(n, "", dtype=object)
+        probs = np.full((n, len(classes)), np.nan)
+        if ok.any():
+            probs[ok] = bundle["model"].predict_proba(bundle["scaler"].transform(X))
+            labels[ok] = np.asarray(classes, dtype=object)[probs[ok].argmax(axis=1)]
+
+        for i in range(n):
+            row = first_row + i
+            if ok[i]:
+                label = labels[i]
+                writer.writerow([row, label, DELAY_MAP.get(label, 0), probs[i].max(), *probs[i], ""])
+            else:
+                writer.writerow([row, "", "", "", *([""] * len(classes)), errors[i]])
+        return n - int(ok.sum())
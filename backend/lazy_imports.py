@@ -0,0 +1,21 @@
+import importlib
+import types
+
+
+class _LazyModule(types.ModuleType):
+    def __getattr__(self, attr):
+        # Only reached for names not copied over yet. import_module holds the
+        # import lock, so threads racing on first use all get the finished module.
+        module = importlib.import_module(self.__name__)
+        self.__dict__.update(module.__dict__)
+        return getattr(module, attr)
+
+
+def lazy_import(name):
+    """
+    Stand-in for module `name` that imports it on first attribute access.
+    Lets main.py import (and /health answer) without paying for
+    NumPy/pandas/joblib until a model is really needed. Nothing is put in
+    sys.modules, so a plain `import name` elsewhere is unaffected.
+    """
+    return _LazyModule(name)
@@ -0,0 +1,170 @@
+"""
+Structured, sampled, non-blocking logging for the backend.
+
+Every module logs through get_logger(__name__). Records go onto an
+in-memory queue and are written to stderr by a single listener thread, so a
+request never waits on stdout. Per-request lines are sampled: the request
+middleware decides once per request (LOG_SAMPLE_RATE) and log_request()
+only emits for sampled requests; 5xx responses are always logged.
+
+    LOG_LEVEL=DEBUG LOG_FORMAT=text LOG_SAMPLE_RATE=1 uvicorn main:app
+
+Wrap expensive debug payloads in Lazy(fn) so they are only built when the
+record is actually going to be emitted.
+"""
+import contextvars
+import json
+import logging
+import logging.handlers
+import os
+import queue
+import random
+import sys
+import time
+
+ROOT = "flight"
+REQUEST_SAMPLED = contextvars.ContextVar("request_sampled", default=False)
+
+_listener = None
+
+
+class Lazy:
+    """Defers building a log value until a handler formats it."""
+    __slots__ = ("fn",)
+
+    def __init__(self, fn):
+        self.fn = fn
+
+    def __str__(self):
+        return str(self.fn())
+
+
+def _resolve(value):
+    return value.fn() if isinstance(value, Lazy) else value
+
+
+class JsonFormatter(logging.Formatter):
+    def format(self, record):
+        entry = {
+            "ts": round(record.created, 6),
+            "level": record.levelname,
+            "logger": record.name,
+            "msg": record.getMessage(),
+        }
+        entry.update(getattr(record, "fields", {}))
+        if record.exc_info:
+            entry["exc"] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class TextFormatter(logging.Formatter):
+    def format(self, record):
+        line = super().format(record)
+        fields = getattr(record, "fields", {})
+        if fields:
+            line += " " + " ".join(f"{k}={v}" for k, v in fields.items())
+        return line
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    def prepare(self, record):
+        # Build Lazy values in the caller: the objects they close over may change later
+        fields = getattr(record, "fields", None)
+        if fields:
+            record.fields = {k: _resolve(v) for k, v in fields.items()}
+        return super().prepare(record)
+
+
+def configure_logging(level=None, fmt=None):
+    """Idempotent; sets up the queue handler and its listener thread."""
+    global _listener
+    if _listener is not None:
+        return
+
+    stream = logging.StreamHandler(sys.stderr)
+    if (fmt or os.environ.get("LOG_FORMAT", "json")) == "text":
+        stream.setFormatter(TextFormatter("%(asctime)s %(levelname)s %(name)s: %(message)s"))
+    else:
+        stream.setFormatter(JsonFormatter())
+
+    log_queue = queue.SimpleQueue()
+    logger = logging.getLogger(ROOT)
+    logger.setLevel((level or os.environ.get("LOG_LEVEL", "INFO")).upper())
+    logger.addHandler(_QueueHandler(log_queue))
+    logger.propagate = False
+
+    _listener = logging.handlers.QueueListener(log_queue, stream)
+    _listener.start()
+
+
+def _restart_in_child():
+    # fork() keeps the queue but not the listener thread: give the child its own pair
+    global _listener
+    if _listener is None:
+        return
+    log_queue = queue.SimpleQueue()
+    for handler in logging.getLogger(ROOT).handlers:
+        if isinstance(handler, _QueueHandler):
+            handler.queue = log_queue
+    _listener = logging.handlers.QueueListener(log_queue, *_listener.handlers)
+    _listener.start()
+
+
+os.register_at_fork(after_in_child=_restart_in_child)
+
+
+def stop_logging():
+    """Flushes whatever is still queued."""
+    global _listener
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def get_logger(name):
+    return logging.getLogger(f"{ROOT}.{name}")
+
+
+def log(logger, level, msg, **fields):
+    if logger.isEnabledFor(level):
+        logger.log(level, msg, extra={"fields": fields})
+
+
+def log_request(logger, msg, level=logging.INFO, **fields):
+    """Per-request line: only emitted when this request was sampled."""
+    if REQUEST_SAMPLED.get():
+        log(logger, level, msg, **fields)
+
+
+class RequestLogMiddleware:
+    """Plain ASGI middleware: samples the request and logs one access line for it."""
+
+    def __init__(self, app, sample_rate=None):
+        self.app = app
+        rate = os.environ.get("LOG_SAMPLE_RATE", "0.01") if sample_rate is None else sample_rate
+        self.sample_rate = float(rate)
+        self.logger = get_logger("access")
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        sampled = random.random() < self.sample_rate
+        token = REQUEST_SAMPLED.set(sampled)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            REQUEST_SAMPLED.reset(token)
+            if sampled or status >= 500:
+                log(self.logger, logging.ERROR if status >= 500 else logging.INFO, "request",
+                    method=scope["method"], path=scope["path"], status=status,
+                    duration_ms=round((time.perf_counter() - start) * 1e3, 3))
@@ -1,11 +1,38 @@
-from fastapi import FastAPI, HTTPException, Request
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-import pandas as pd
-import numpy as np
-import joblib
+from fastapi.concurrency import run_in_threadpool
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import FileResponse, PlainTextResponse
+import asyncio
+import logging
 import os
+import tempfile
+from typing import Literal, Optional
+
+from logs import Lazy, RequestLogMiddleware, configure_logging, get_logger, log, log_request, stop_logging
+from inference import ItemError, observe_severity_labels
+import inference_worker
+from batcher import MicroBatcher
+import drift
+from cache import PredictionCache
+from executor import InferenceExecutor, QueueFull
+from jobs import BulkJobs
+import metrics
+from metrics import (
+    CACHE_EVENTS, CACHE_SIZE, CHART_SECONDS, STAGE_SECONDS, MetricsMiddleware, add_collector, render,
+    set_metrics_dir, start_exporter, totals,
+)
+from registry import ModelRegistry
+from schemas import (
+    CalculatorRequest, FastJSONResponse, SeasonalRequest, SeverityRequest, unseen_labels, validate_json,
+)
+
+configure_logging()
+logger = get_logger("main")
 
 app = FastAPI(title="Unified Flight AI Backend")
+app.add_middleware(RequestLogMiddleware)
+app.add_middleware(MetricsMiddleware)
 
 app.add_middleware(
     CORSMiddleware,
@@ -15,305 +42,357 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# --- HELPER FUNCTIONS (These were missing!) ---
-
-def get_yearly_trend(carrier, airport, avg_df):
-    """Generates 12-month trend data for the Seasonal Chart."""
-    if avg_df is None: return []
-    
-    # Filter for the specific route
-    route_data = avg_df[(avg_df['carrier'] == carrier) & (avg_df['airport'] == airport)].copy()
-    trend_data = []
-    
-    # Loop 1-12 to ensure every month has a value (even if 0)
-    for m in range(1, 13):
-        month_stats = route_data[route_data['month'] == m]
-        if not month_stats.empty:
-            risk_val = month_stats.iloc[0]['WeatherDelayProportion']
-            volume_val = month_stats.iloc[0]['TotalFlights']
-        else:
-            risk_val = 0
-            volume_val = 0
-            
-        trend_data.append({
-            "month": m, 
-            "risk_score": float(risk_val), 
-            "flight_volume": int(volume_val)
-        })
-    return trend_data
-
-def get_competitor_analysis(current_carrier, airport, month, avg_df):
-    """Finds comparison data for the Radar Chart."""
-    if avg_df is None: return []
-    
-    # Find other carriers at same airport/month
-    competitors = avg_df[
-        (avg_df['airport'] == airport) & 
-        (avg_df['month'] == month) & 
-        (avg_df['carrier'] != current_carrier)
-    ].copy()
-    
-    if competitors.empty: return []
-
-    # Sort by lowest risk
-    competitors = competitors.sort_values('WeatherDelayProportion')
-    
-    results = []
-    for _, row in competitors.head(3).iterrows(): 
-        results.append({
-            "carrier": row['carrier'],
-            "risk_score": float(row['WeatherDelayProportion']),
-            "flight_volume": int(row['TotalFlights'])
-        })
-    return results
+# --- LOAD MODELS ---
+BASE_DIR = os.environ.get("MODEL_DIR", os.path.dirname(os.path.abspath(__file__)))
+REGISTRY = ModelRegistry(BASE_DIR)
 
+# eager: load at startup; background: serve at once, warm on a thread; lazy: load on first use
+MODEL_LOAD_MODE = os.environ.get("MODEL_LOAD_MODE", "eager")
+SERVED_MODELS = ["flight", "severity"]
+# No route uses simple_model.pkl; it only loads if something asks for it
+REGISTRY.defer(["simple"])
+# Set by prefork.py: models are loaded (and reloaded) by the parent before it forks us
+PREFORK = os.environ.get("PREFORK") == "1"
+PREFORK_GENERATION = None
+# INFERENCE_EXECUTOR=process: the spawned workers own the models, cache and inference metrics
+PROCESS_EXECUTOR = os.environ.get("INFERENCE_EXECUTOR", "thread") == "process"
+if MODEL_LOAD_MODE != "eager" or PROCESS_EXECUTOR:
+    # In process mode the parent only loads a model if a route needs it here (e.g. Chart 3 validation)
+    REGISTRY.defer(SERVED_MODELS)
+if PROCESS_EXECUTOR and not metrics.METRICS_DIR:
+    # Without it the workers' cache, drift and stage metrics never reach this process
+    set_metrics_dir(tempfile.mkdtemp(prefix="flight-metrics-"))
+
+# Repeat Chart 2 / Chart 3 inputs skip inference (size 0 disables)
+PREDICT_CACHE_SIZE = int(os.environ.get("PREDICT_CACHE_SIZE", "4096"))
+PREDICT_CACHE_TTL = float(os.environ.get("PREDICT_CACHE_TTL", "3600"))
+PREDICTION_CACHE = PredictionCache(maxsize=PREDICT_CACHE_SIZE, ttl=PREDICT_CACHE_TTL)
+MODEL_RELOAD_INTERVAL = float(os.environ.get("MODEL_RELOAD_INTERVAL", "5"))
+
+# Bounded pool for blocking model work (INFERENCE_EXECUTOR=thread|process)
+EXECUTOR = InferenceExecutor(
+    kind="process" if PROCESS_EXECUTOR else "thread",
+    workers=int(os.environ.get("INFERENCE_WORKERS", "0")) or None,
+    max_pending=int(os.environ.get("INFERENCE_QUEUE_SIZE", "64")),
+    initializer=inference_worker.init,
+    initargs=(BASE_DIR, metrics.METRICS_DIR, PREDICT_CACHE_SIZE, PREDICT_CACHE_TTL, MODEL_RELOAD_INTERVAL),
+)
+
+async def run_inference(kind, items):
+    try:
+        if PROCESS_EXECUTOR:
+            return await EXECUTOR.run(inference_worker.score, kind, items)
+        return await EXECUTOR.run(inference_worker.score_with, REGISTRY, PREDICTION_CACHE, kind, items)
+    except QueueFull:
+        raise HTTPException(503, "Inference queue is full, retry shortly", headers={"Retry-After": "1"})
+
+# Concurrent single /predict calls share one vectorized call (MICROBATCH_WAIT_MS=0 disables)
+MICROBATCH_WAIT_MS = float(os.environ.get("MICROBATCH_WAIT_MS", "2"))
+BATCHER = MicroBatcher(
+    run_inference,
+    max_items=int(os.environ.get("MICROBATCH_MAX_ITEMS", "64")),
+    max_wait=MICROBATCH_WAIT_MS / 1e3,
+)
+
+async def predict_one(kind, item):
+    with CHART_SECONDS.time(kind):
+        if MICROBATCH_WAIT_MS <= 0:
+            return (await run_inference(kind, [item]))[0]
+        return await BATCHER.submit(kind, item)
+
+if not PROCESS_EXECUTOR:
+    add_collector(lambda: inference_worker.collect_cache_stats(PREDICTION_CACHE))
 
-# --- LOAD MODELS ---
-MODELS = {}
 @app.on_event("startup")
 def load_models():
-    base_dir = os.path.dirname(os.path.abspath(__file__))
-    print(f"📂 Loading models from: {base_dir}")
-    
-    # Chart 2 Model
-    try:
-        path = os.path.join(base_dir, "flight_model.pkl")
-        if os.path.exists(path):
-            pkg = joblib.load(path)
-            MODELS["flight"] = pkg
-            print("✅ Chart 2 Model Loaded")
-        else:
-            print("⚠️ flight_model.pkl not found")
-    except Exception as e: print(f"⚠️ Chart 2 Model Error: {e}")
+    if PREFORK:
+        # Inherited from the parent; loading or watching here would give this worker private copies
+        start_exporter()
+        return
+    log(logger, logging.INFO, "loading models", model_dir=BASE_DIR, mode=MODEL_LOAD_MODE)
+    REGISTRY.load_all()
+    if MODEL_LOAD_MODE == "background" and not PROCESS_EXECUTOR:
+        REGISTRY.warm(SERVED_MODELS)
 
-    # Chart 3 Model
-    try:
-        path = os.path.join(base_dir, "delay_severity_model.pkl")
-        if os.path.exists(path):
-            pkg = joblib.load(path)
-            if isinstance(pkg, dict):
-                MODELS["severity"] = pkg.get("model")
-                MODELS["severity_encoders"] = pkg.get("encoders")
-                
-                # 🔍 PRINT VALID VALUES
-                print("✅ Chart 3 Model Loaded")
-                print("📋 Valid Flight_Status values:", list(pkg["encoders"]["status"].classes_))
-                print("📋 Valid Airlines:", list(pkg["encoders"]["airline"].classes_))
-                print("📋 Valid Departure Airports:", list(pkg["encoders"]["departure"].classes_))
-                print("📋 Valid Arrival Airports:", list(pkg["encoders"]["arrival"].classes_))
-            else:
-                MODELS["severity"] = pkg
-                MODELS["severity_encoders"] = {}
-            print("✅ Chart 3 Model Loaded")
-    except Exception as e: print(f"⚠️ Chart 3 Model Error: {e}")
-
-    # Simple Model (Duration)
-    try:
-        path = os.path.join(base_dir, "simple_model.pkl")
-        if os.path.exists(path):
-            MODELS["simple"] = joblib.load(path)
-            print("✅ Simple Model Loaded")
-    except Exception as e: print(f"⚠️ Simple Model Error: {e}")
+    severity = REGISTRY.get("severity")
+    if severity and severity["encoders"]:
+        encoders = severity["encoders"]
+        log(logger, logging.INFO, "severity encoders",
+            **{f"{name}_classes": len(enc.classes_) for name, enc in encoders.items()})
+        log(logger, logging.DEBUG, "severity encoder classes",
+            **{name: Lazy(lambda enc=enc: list(enc.classes_)) for name, enc in encoders.items()})
+
+    # Pick up retrained pickles without a restart (0 disables)
+    REGISTRY.start_watcher(MODEL_RELOAD_INTERVAL)
+    start_exporter()
+
+@app.on_event("shutdown")
+def stop_model_watcher():
+    REGISTRY.stop_watcher()
+    EXECUTOR.shutdown()
+    BULK_JOBS.shutdown()
+    stop_logging()
 
 
 # --- SMART PREDICT ENDPOINT ---
 @app.post("/predict")
 async def smart_predict(request: Request):
     try:
-        data = await request.json()
+        with STAGE_SECONDS.time("legacy", "json_parsing"):
+            data = await request.json()
     except:
         raise HTTPException(400, "Invalid JSON")
 
     # --- CASE 1: CHART 1 (Prediction Tool / Calculator) ---
     if "weather_delay_count" in data:
-        print("🔹 Handling Chart 1 Request")
+        log_request(logger, "legacy predict", chart="calculator")
         try:
-            total_delay = (
-                float(data.get('carrier_delay_count', 0)) +
-                float(data.get('late_aircraft_count', 0)) +
-                (float(data.get('cancelled_flights', 0)) * 30)
-            )
-            return {
-                "message": "Calculation Success",
-                "high_weather_risk": float(data.get('weather_delay_count', 0)) > 5,
-                "total_delay_minutes": total_delay,
-                "delay_category": "Major" if total_delay > 45 else "Minor"
-            }
+            return calculate_delay(CalculatorRequest(
+                weather_delay_count=float(data.get('weather_delay_count', 0)),
+                carrier_delay_count=float(data.get('carrier_delay_count', 0)),
+                late_aircraft_count=float(data.get('late_aircraft_count', 0)),
+                cancelled_flights=float(data.get('cancelled_flights', 0)),
+            ))
         except Exception as e:
             raise HTTPException(400, f"Calculation Error: {str(e)}")
 
     # --- CASE 2: CHART 2 (Seasonal Risk) ---
-    elif "year" in data and "month" in data and MODELS.get("flight"):
-        print("🔹 Handling Chart 2 Request")
-        pkg = MODELS["flight"]
-        avg_df = pkg["avg_df"]
-        pipeline = pkg["pipeline"]
-        threshold = pkg["threshold"]
-        
-        # 1. Look for exact historical match
-        match = avg_df[
-            (avg_df['carrier'] == data['carrier']) & 
-            (avg_df['airport'] == data['airport']) & 
-            (avg_df['month'] == data['month'])
-        ]
-        
-        if not match.empty:
-            row = match.iloc[0]
-        else:
-            # Fallback to average if no exact route/month found
-            row = avg_df.mean(numeric_only=True)
-            row['month'] = data['month']
-            row['carrier'] = data['carrier']
-            row['airport'] = data['airport']
-
-        # 2. Make Prediction
-        # We drop target columns so the model only sees features
-        input_df = pd.DataFrame([row]).drop(columns=['HighWeatherImpact_Class', 'WeatherDelayProportion'], errors='ignore')
-        
+    elif "year" in data and "month" in data and REGISTRY.available("flight"):
+        log_request(logger, "legacy predict", chart="seasonal")
+        return _single(await predict_one("seasonal", data))
+
+    # --- CASE 3: CHART 3 (Severity/Duration) ---
+    elif "Airline" in data and REGISTRY.available("severity"):
+        log_request(logger, "legacy predict", chart="severity")
+        log_request(logger, "legacy predict payload", level=logging.DEBUG, payload=Lazy(lambda: dict(data)))
         try:
-            pred = pipeline.predict(input_df)[0]
-            probs = pipeline.predict_proba(input_df)[0]
+            return _single(await predict_one("severity", data))
+        except HTTPException:
+            raise
         except Exception as e:
-            print(f"Prediction Error: {e}")
-            # Fallback if prediction fails (e.g. unseen carrier)
-            pred = 0
-            probs = [0.5, 0.5]
+            logger.exception("Chart 3 prediction failed")
+            raise HTTPException(500, f"Chart 3 Error: {str(e)}")
+
+    raise HTTPException(400, "Unrecognised prediction payload")
+
 
-        # 3. GENERATE CHART DATA (The Fix)
-        trend_data = get_yearly_trend(data['carrier'], data['airport'], avg_df)
-        competitors = get_competitor_analysis(data['carrier'], data['airport'], data['month'], avg_df)
+def _single(result):
+    if isinstance(result, ItemError):
+        raise HTTPException(result.status, str(result))
+    return result
 
+
+def calculate_delay(req):
+    with CHART_SECONDS.time("calculator"):
+        total_delay = req.carrier_delay_count + req.late_aircraft_count + req.cancelled_flights * 30
         return {
-            "risk_level": "HIGH RISK" if pred == 1 else "LOW RISK",
-            "risk_class": int(pred),
-            "confidence_high_risk": float(probs[1]),
-            "historical_weather_prop": float(row.get('WeatherDelayProportion', 0)),
-            "threshold": float(threshold),
-            "trend_data": trend_data,   # <--- Now filled with real data
-            "competitors": competitors  # <--- Now filled with real data
+            "message": "Calculation Success",
+            "high_weather_risk": req.weather_delay_count > 5,
+            "total_delay_minutes": total_delay,
+            "delay_category": "Major" if total_delay > 45 else "Minor"
         }
 
-  # --- CASE 3: CHART 3 (Severity/Duration) ---
-    elif "Airline" in data and MODELS.get("severity"):
-        print("🔹 Handling Chart 3 Request")
-        print(f"📥 Received data: {data}")
-    
+
+async def _require(name):
+    pkg = REGISTRY.get(name)
+    if pkg is None:
+        # Deferred model: load it off the event loop
+        pkg = await asyncio.to_thread(REGISTRY.ensure, name)
+    if pkg is None:
+        raise HTTPException(503, f"{name} model not loaded")
+    return pkg
+
+
+# --- TYPED PER-CHART ENDPOINTS ---
+# Validated once by Pydantic, no key probing; responses skip jsonable_encoder
+@app.post("/predict/calculator", response_class=FastJSONResponse)
+def predict_calculator(req: CalculatorRequest):
+    return FastJSONResponse(calculate_delay(req))
+
+@app.post("/predict/seasonal", response_class=FastJSONResponse)
+async def predict_seasonal(req: SeasonalRequest):
+    if not REGISTRY.available("flight"):
+        raise HTTPException(503, "flight model not loaded")
+    return FastJSONResponse(_single(await predict_one("seasonal", req.model_dump())))
+
+@app.post("/predict/severity", response_class=FastJSONResponse)
+async def predict_severity(request: Request):
+    # The allowed labels come from the live encoders, so they are checked after parsing
+    bundle = await _require("severity")
+    body = await request.body()
+    with STAGE_SECONDS.time("severity", "json_parsing"):
+        req = validate_json(SeverityRequest, body)
+    errors = unseen_labels(bundle, req)
+    if errors:
+        # Never reaches the scorer, so tally it for drift here
+        observe_severity_labels(bundle, req.model_dump())
+        raise RequestValidationError(errors)
+    return FastJSONResponse(_single(await predict_one("severity", req.model_dump())))
+
+
+# --- ROUTE CUBE ---
+# Any (carrier, airport, month) slice of the training aggregates, optionally top-N by risk
+@app.get("/routes", response_class=FastJSONResponse)
+async def route_slice(
+    carrier: Optional[str] = None,
+    airport: Optional[str] = None,
+    month: Optional[int] = Query(None, ge=1, le=12),
+    top: Optional[int] = Query(None, ge=1),
+    order: Literal["lowest", "highest"] = "lowest",
+    min_flights: float = Query(0, ge=0),
+):
+    cube = (await _require("flight"))["cube"]
     try:
-        # Get the model components
-        model = MODELS["severity"]
-        encoders = MODELS.get("severity_encoders", {})
-        
-        print(f"✅ Model loaded: {model is not None}")
-        print(f"✅ Encoders loaded: {list(encoders.keys())}")
-        
-        # Load the full bundle to get scaler and feature order
-        base_dir = os.path.dirname(os.path.abspath(__file__))
-        bundle_path = os.path.join(base_dir, "delay_severity_model.pkl")
-        print(f"📂 Loading bundle from: {bundle_path}")
-        
-        bundle = joblib.load(bundle_path)
-        scaler = bundle["scaler"]
-        feature_order = bundle["feature_order"]
-        
-        print(f"✅ Feature order: {feature_order}")
-        
-        # Parse datetime from input
-        print(f"🕐 Parsing datetime: {data['Departure_Time']}")
-        dt = pd.to_datetime(data["Departure_Time"], format="%d/%m/%Y %H:%M", errors="coerce")
-        
-        if pd.isna(dt):
-            print("❌ DateTime parsing failed!")
-            raise HTTPException(400, f"Invalid Departure_Time format. Received: {data['Departure_Time']}")
-        
-        print(f"✅ Parsed datetime: {dt}")
-        
-        # Encode categorical features
-        print("🔄 Encoding features...")
-        try:
-            print(f"  Airline: {data['Airline']}")
-            airline_enc = encoders["airline"].transform([data["Airline"]])[0]
-            print(f"  ✅ Airline encoded: {airline_enc}")
-            
-            print(f"  Departure: {data['Departure_Airport']}")
-            departure_enc = encoders["departure"].transform([data["Departure_Airport"]])[0]
-            print(f"  ✅ Departure encoded: {departure_enc}")
-            
-            print(f"  Arrival: {data['Arrival_Airport']}")
-            arrival_enc = encoders["arrival"].transform([data["Arrival_Airport"]])[0]
-            print(f"  ✅ Arrival encoded: {arrival_enc}")
-            
-            print(f"  Status: {data['Flight_Status']}")
-            status_enc = encoders["status"].transform([data["Flight_Status"]])[0]
-            print(f"  ✅ Status encoded: {status_enc}")
-            
-        except ValueError as ve:
-            print(f"❌ Encoding error: {ve}")
-            raise HTTPException(400, f"Value not found in training data: {str(ve)}")
-        
-        # Create input DataFrame with exact feature order
-        input_df = pd.DataFrame([{
-            "Dep_Hour": dt.hour,
-            "Dep_Day": dt.day,
-            "Dep_Month": dt.month,
-            "Dep_Weekday": dt.dayofweek,
-            "Airline_Encoded": airline_enc,
-            "Departure_Encoded": departure_enc,
-            "Arrival_Encoded": arrival_enc,
-            "Status_Encoded": status_enc,
-        }])
-        
-        print(f"✅ Input DataFrame created: {input_df.to_dict()}")
-        
-        # Ensure correct column order
-        X = input_df[feature_order]
-        print(f"✅ Features ordered: {X.values}")
-        
-        # Scale features
-        X_scaled = scaler.transform(X)
-        print(f"✅ Features scaled: {X_scaled}")
-        
-        # Make prediction
-        prediction = model.predict(X_scaled)[0]
-        probabilities = model.predict_proba(X_scaled)[0]
-        print(f"✅ Prediction: {prediction}")
-        print(f"✅ Probabilities: {probabilities}")
-        
-        # Map severity to estimated delay minutes
-        delay_map = {"No Delay": 0, "Minor": 15, "Major": 60}
-        estimated_delay = delay_map.get(prediction, 0)
-        
-        # Get confidence for the predicted class
-        predicted_idx = list(model.classes_).index(prediction)
-        confidence = float(probabilities[predicted_idx])
-        
-        result = {
-            "predicted_severity": prediction,
-            "estimated_delay_minutes": estimated_delay,
-            "severity_confidence": confidence,
-            "all_probabilities": {
-                str(cls): float(prob) 
-                for cls, prob in zip(model.classes_, probabilities)
-            }
-        }
-        
-        print(f"✅ Returning result: {result}")
-        return result
-        
-    except HTTPException:
-        raise
-    except Exception as e:
-        import traceback
-        error_details = traceback.format_exc()
-        print(f"❌ FULL ERROR:\n{error_details}")
-        raise HTTPException(500, f"Chart 3 Error: {str(e)}")
+        cells, matched = cube.query(carrier, airport, month, top, order, min_flights)
+    except KeyError as e:
+        raise HTTPException(404, f"Unknown carrier or airport: {e.args[0]}")
+    return FastJSONResponse({
+        "carrier": carrier, "airport": airport, "month": month, "order": order,
+        "matched": matched, "cells": cells,
+    })
+
+
+# --- BATCH PREDICT ENDPOINT ---
+BATCH_MAX_ITEMS = int(os.environ.get("BATCH_MAX_ITEMS", "10000"))
+
+@app.post("/predict/batch")
+async def batch_predict(request: Request):
+    """Scores an array of Chart 2 and/or Chart 3 payloads; one result per item, in order."""
+    try:
+        data = await request.json()
+    except:
+        raise HTTPException(400, "Invalid JSON")
+
+    items = data.get("items") if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        raise HTTPException(400, "Expected a JSON array or {\"items\": [...]}")
+    if len(items) > BATCH_MAX_ITEMS:
+        raise HTTPException(413, f"Batch too large (max {BATCH_MAX_ITEMS} items)")
+
+    # Group by chart so each model sees one vectorized call
+    groups = {"seasonal": [], "severity": []}
+    results = [None] * len(items)
+    for i, item in enumerate(items):
+        if isinstance(item, dict) and "year" in item and "month" in item:
+            groups["seasonal"].append(i)
+        elif isinstance(item, dict) and "Airline" in item:
+            groups["severity"].append(i)
+        else:
+            results[i] = ItemError("Unrecognised prediction payload")
+
+    for kind, positions in groups.items():
+        if not positions:
+            continue
+        scored = await run_inference(kind, [items[i] for i in positions])
+        for i, result in zip(positions, scored):
+            results[i] = result
+
+    return {"results": [
+        {"status": r.status, "error": str(r)} if isinstance(r, ItemError)
+        else {"status": 200, "result": r}
+        for r in results
+    ]}
+
+# --- BULK SCORING JOBS ---
+# Chart 3 over whole schedule CSVs (flight_data_prices.csv columns), off the request path
+BULK_JOBS = BulkJobs(
+    os.environ.get("BULK_JOB_DIR", os.path.join(tempfile.gettempdir(), "flight-jobs")),
+    REGISTRY,
+    chunksize=int(os.environ.get("BULK_CHUNK_ROWS", "50000")),
+    workers=int(os.environ.get("BULK_JOB_WORKERS", "1")),
+)
+BULK_MAX_BYTES = int(os.environ.get("BULK_MAX_BYTES", str(2 << 30)))
+
+@app.post("/jobs/severity", status_code=202)
+async def create_severity_job(request: Request):
+    """Body: the raw CSV (Content-Type: text/csv). Streamed to disk, then scored in the background."""
+    # No multipart parser is installed: a form upload would be scored as garbage
+    content_type = request.headers.get("content-type", "").split(";")[0].strip().lower()
+    if content_type != "text/csv":
+        raise HTTPException(415, "Send the CSV itself as the request body with Content-Type: text/csv")
+    job_id, path = BULK_JOBS.new_upload()
+    size = 0
+    f = await run_in_threadpool(open, path, "wb")
+    try:
+        async for block in request.stream():
+            size += len(block)
+            if size > BULK_MAX_BYTES:
+                break
+            await run_in_threadpool(f.write, block)
+    finally:
+        await run_in_threadpool(f.close)
+    if size == 0 or size > BULK_MAX_BYTES:
+        os.remove(path)
+        if size:
+            raise HTTPException(413, f"Upload too large (max {BULK_MAX_BYTES} bytes)")
+        raise HTTPException(400, "Empty upload")
+
+    job = BULK_JOBS.submit(job_id)
+    return {**job, "status_url": f"/jobs/{job_id}", "result_url": f"/jobs/{job_id}/result"}
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    job = BULK_JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(404, "Unknown job")
+    return job
+
+@app.get("/jobs/{job_id}/result")
+def job_result(job_id: str):
+    job = BULK_JOBS.get(job_id)
+    if job is None:
+        raise HTTPException(404, "Unknown job")
+    if job["state"] != "done":
+        raise HTTPException(409, f"Job is {job['state']}")
+    return FileResponse(BULK_JOBS.result_path(job_id), media_type="text/csv", filename=f"severity-{job_id}.csv")
 
 @app.get("/options")
 def get_options():
-    if MODELS.get("flight"):
-        return {"carriers": MODELS["flight"]["carriers"], "airports": MODELS["flight"]["airports"]}
-    return {"carriers": [], "airports": []}
+    return REGISTRY.options()
+
+@app.get("/drift")
+def drift_report():
+    # Live tallies of every worker against the training profile (the parent of a
+    # process executor has no models loaded, so that one comes from the sidecar)
+    report = {"psi_alert": drift.PSI_ALERT}
+    for chart, model in (("seasonal", "flight"), ("severity", "severity")):
+        report[chart] = drift.compare(REGISTRY.profile(model), drift.live_profile(chart))
+    return report
+
+@app.get("/cache/stats")
+def cache_stats():
+    if not PROCESS_EXECUTOR:
+        return PREDICTION_CACHE.stats()
+    # One cache per executor process: add up what they exported
+    events = {outcome: int(v) for (outcome,), v in totals(CACHE_EVENTS).items()}
+    lookups = events.get("hits", 0) + events.get("misses", 0)
+    return {
+        "size": int(sum(totals(CACHE_SIZE).values())),
+        "maxsize": PREDICT_CACHE_SIZE,
+        "ttl_seconds": PREDICT_CACHE_TTL,
+        **{outcome: events.get(outcome, 0) for outcome in ("hits", "misses", "evictions", "expirations")},
+        "hit_rate": events.get("hits", 0) / lookups if lookups else 0.0,
+        "processes": EXECUTOR.workers,
+    }
+
+@app.get("/metrics")
+def metrics_endpoint():
+    return PlainTextResponse(render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/inference/stats")
+def inference_stats():
+    return {**EXECUTOR.stats(), "microbatch": BATCHER.stats()}
 
 @app.get("/health")
 async def health():
-    return {"All good! The flight delay engine is running smoothly",
-        }
\ No newline at end of file
+    models = REGISTRY.status()
+    report = {
+        "message": "All good! The flight delay engine is running smoothly",
+        # In process mode "deferred" here means loaded by the executor processes instead
+        "ready": all(models[name]["state"] == "ready" or (PROCESS_EXECUTOR and models[name]["state"] == "deferred")
+                     for name in SERVED_MODELS),
+        "models": models,
+    }
+    if PREFORK:
+        report["worker"] = {"pid": os.getpid(), "generation": PREFORK_GENERATION}
+    return report
\ No newline at end of file
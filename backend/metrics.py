@@ -0,0 +1,275 @@
+"""
+Minimal Prometheus metrics: counters, gauges and histograms rendered in the
+text exposition format, with no client library.
+
+Recording is a dict lookup, a bisect and two adds under a per-metric lock,
+cheap enough to leave on. With several workers set METRICS_DIR: each process
+writes its snapshot to METRICS_DIR/<pid>.json every METRICS_FLUSH_INTERVAL
+seconds, and /metrics sums every file. Gauges of processes that have exited
+are dropped; their counters and histograms are kept, as prometheus_client's
+multiprocess mode does. Empty the directory when deploying.
+"""
+import bisect
+import glob
+import json
+import os
+import threading
+import time
+
+from procs import pid_alive
+
+# Seconds; /predict stages run from ~50 µs (dict lookups) to ~100 ms (cold sklearn)
+BUCKETS = (0.00005, 0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1.0)
+
+_metrics = []
+_collectors = []
+
+
+class _Metric:
+    kind = None
+
+    def __init__(self, name, help, labelnames=()):
+        self.name = name
+        self.help = help
+        self.labelnames = tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+        _metrics.append(self)
+
+    def snapshot(self):
+        with self._lock:
+            values = {json.dumps(labels): _copy(v) for labels, v in self._values.items()}
+        return {"kind": self.kind, "help": self.help, "labelnames": self.labelnames, "values": values}
+
+
+def _copy(value):
+    return list(value) if isinstance(value, list) else value
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def inc(self, *labels, amount=1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def set_total(self, value, *labels):
+        """For collectors mirroring a running total kept elsewhere (e.g. cache hits)."""
+        with self._lock:
+            self._values[labels] = float(value)
+
+
+class Gauge(_Metric):
+    kind = "gauge"
+
+    def set(self, value, *labels):
+        with self._lock:
+            self._values[labels] = float(value)
+
+    def inc(self, *labels, amount=1.0):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels, amount=1.0):
+        self.inc(*labels, amount=-amount)
+
+
+class _Timer:
+    __slots__ = ("histogram", "labels", "start")
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.histogram.observe(time.perf_counter() - self.start, *self.labels)
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name, help, labelnames=(), buckets=BUCKETS):
+        super().__init__(name, help, labelnames)
+        self.buckets = tuple(buckets)
+
+    def observe(self, value, *labels):
+        # Per label set: [count per bucket..., +Inf count, sum]
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            slots = self._values.get(labels)
+            if slots is None:
+                slots = self._values[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            slots[i] += 1
+            slots[-1] += value
+
+    def time(self, *labels):
+        return _Timer(self, labels)
+
+    def snapshot(self):
+        snap = super().snapshot()
+        snap["buckets"] = self.buckets
+        return snap
+
+
+def add_collector(fn):
+    """`fn()` runs before every snapshot, to copy values (e.g. cache stats) into gauges."""
+    _collectors.append(fn)
+
+
+def snapshot():
+    for fn in _collectors:
+        fn()
+    return {"pid": os.getpid(), "metrics": {m.name: m.snapshot() for m in _metrics}}
+
+
+# -------------------------------------------------------
+# MULTI-WORKER
+# -------------------------------------------------------
+METRICS_DIR = os.environ.get("METRICS_DIR")
+_exporter = None
+
+
+def set_metrics_dir(directory):
+    """Overrides METRICS_DIR; call before start_exporter()."""
+    global METRICS_DIR
+    METRICS_DIR = directory
+
+
+def write_snapshot(directory=None):
+    path = os.path.join(directory or METRICS_DIR, f"{os.getpid()}.json")
+    with open(path + ".tmp", "w") as f:
+        json.dump(snapshot(), f)
+    os.replace(path + ".tmp", path)
+
+
+def start_exporter(interval=None):
+    """Writes this process's snapshot to METRICS_DIR periodically (no-op without it)."""
+    global _exporter
+    if not METRICS_DIR or _exporter is not None:
+        return
+    os.makedirs(METRICS_DIR, exist_ok=True)
+    interval = interval or float(os.environ.get("METRICS_FLUSH_INTERVAL", "1"))
+
+    def _loop():
+        while True:
+            write_snapshot()
+            time.sleep(interval)
+
+    _exporter = threading.Thread(target=_loop, name="metrics-exporter", daemon=True)
+    _exporter.start()
+
+
+def _gather():
+    if not METRICS_DIR:
+        return [snapshot()]
+    write_snapshot()
+    snapshots = []
+    for path in glob.glob(os.path.join(METRICS_DIR, "*.json")):
+        try:
+            with open(path) as f:
+                snapshots.append(json.load(f))
+        except (OSError, ValueError):
+            continue  # being replaced right now
+    return snapshots
+
+
+def _merge(snapshots):
+    merged = {}
+    for snap in snapshots:
+        alive = snap["pid"] == os.getpid() or pid_alive(snap["pid"])
+        for name, metric in snap["metrics"].items():
+            if metric["kind"] == "gauge" and not alive:
+                continue
+            target = merged.setdefault(name, {**metric, "values": {}})
+            for labels, value in metric["values"].items():
+                if labels not in target["values"]:
+                    target["values"][labels] = _copy(value)
+                elif isinstance(value, list):
+                    target["values"][labels] = [a + b for a, b in zip(target["values"][labels], value)]
+                else:
+                    target["values"][labels] += value
+    return merged
+
+
+def totals(metric):
+    """{label tuple: value} of one counter or gauge, summed over every worker."""
+    values = _merge(_gather()).get(metric.name, {}).get("values", {})
+    return {tuple(json.loads(labels)): value for labels, value in values.items()}
+
+
+# -------------------------------------------------------
+# EXPOSITION
+# -------------------------------------------------------
+def _label_str(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ""
+    escaped = (str(v).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, v in pairs)
+    return "{" + ",".join(f'{k}="{v}"' for (k, _), v in zip(pairs, escaped)) + "}"
+
+
+def _num(value):
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+def render():
+    """The merged metrics of every worker, in Prometheus text format 0.0.4."""
+    lines = []
+    for name, metric in sorted(_merge(_gather()).items()):
+        lines.append(f"# HELP {name} {metric['help']}")
+        lines.append(f"# TYPE {name} {metric['kind']}")
+        names = metric["labelnames"]
+        for labels_json, value in sorted(metric["values"].items()):
+            labels = json.loads(labels_json)
+            if metric["kind"] != "histogram":
+                lines.append(f"{name}{_label_str(names, labels)} {_num(value)}")
+                continue
+            cumulative = 0
+            for bound, count in zip(list(metric["buckets"]) + ["+Inf"], value[:-1]):
+                cumulative += count
+                le = bound if bound == "+Inf" else repr(float(bound))
+                lines.append(f"{name}_bucket{_label_str(names, labels, [('le', le)])} {cumulative}")
+            lines.append(f"{name}_sum{_label_str(names, labels)} {repr(float(value[-1]))}")
+            lines.append(f"{name}_count{_label_str(names, labels)} {cumulative}")
+    return "\n".join(lines) + "\n"
+
+
+# -------------------------------------------------------
+# BACKEND METRICS
+# -------------------------------------------------------
+REQUEST_SECONDS = Histogram("flight_request_seconds", "HTTP request latency", ("route",))
+IN_FLIGHT = Gauge("flight_requests_in_flight", "HTTP requests currently being served")
+CHART_SECONDS = Histogram("flight_predict_seconds", "Prediction latency per chart", ("chart",))
+STAGE_SECONDS = Histogram("flight_stage_seconds", "Latency of each inference stage", ("chart", "stage"))
+MODEL_LOAD_SECONDS = Gauge("flight_model_load_seconds", "Duration of the last load of each model", ("model",))
+CACHE_EVENTS = Counter("flight_prediction_cache_total", "Prediction cache events by outcome", ("outcome",))
+CACHE_SIZE = Gauge("flight_prediction_cache_entries", "Entries in the prediction cache")
+# Label values are training classes plus one unseen bucket, so the label sets stay bounded
+DRIFT_INPUTS = Counter("flight_drift_inputs_total", "Live inputs by chart, feature and value",
+                       ("chart", "feature", "value"))
+DRIFT_PREDICTIONS = Counter("flight_drift_predictions_total", "Live predictions by chart and class",
+                            ("chart", "class"))
+
+
+class MetricsMiddleware:
+    """Plain ASGI middleware: in-flight count and latency per route template."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            IN_FLIGHT.dec()
+            # The matched route's template, so unknown paths cannot blow up the label set
+            route = scope.get("route")
+            REQUEST_SECONDS.observe(time.perf_counter() - start, getattr(route, "path", "unmatched"))
@@ -0,0 +1,114 @@
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow as pa
+    import pyarrow.feather as feather
+except ImportError:  # pragma: no cover - cache is an optimisation only
+    pa = None
+    feather = None
+
+# Typed schema for flight_data_prices.csv
+FLIGHT_DTYPES = {
+    "Airline": "category",
+    "Departure_Airport": "category",
+    "Arrival_Airport": "category",
+    "Flight_Status": "category",
+    "Flight_Duration_Minutes": "int32",
+    "Price_USD": "float32",
+    "Delay_Minutes": "int32",
+    "Weather_Impact": "int8",
+}
+TIME_COLUMN = "Departure_Time"
+TIME_FORMAT = "%d/%m/%Y %H:%M"
+
+# Schema metadata key holding the source file's fingerprint
+_META_KEY = b"source_fingerprint"
+
+
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _fingerprint(path, with_hash=True):
+    st = os.stat(path)
+    fp = {"mtime_ns": st.st_mtime_ns, "size": st.st_size}
+    if with_hash:
+        fp["sha256"] = _file_hash(path)
+    return fp
+
+
+def read_flight_csv(csv_path, columns=None):
+    """Parses the raw CSV straight into the typed schema (no cache)."""
+    usecols = None if columns is None else list(columns)
+    dtypes = {c: t for c, t in FLIGHT_DTYPES.items() if usecols is None or c in usecols}
+    df = pd.read_csv(csv_path, usecols=usecols, dtype=dtypes)
+    if TIME_COLUMN in df.columns:
+        df[TIME_COLUMN] = pd.to_datetime(df[TIME_COLUMN], format=TIME_FORMAT, errors="coerce")
+    return df
+
+
+def cache_path_for(csv_path):
+    return os.path.splitext(csv_path)[0] + ".arrow"
+
+
+def _cached_fingerprint(cache_path):
+    try:
+        with pa.memory_map(cache_path, "r") as source:
+            metadata = pa.ipc.open_file(source).schema.metadata or {}
+    except (OSError, pa.ArrowInvalid):
+        return None
+    raw = metadata.get(_META_KEY)
+    return json.loads(raw) if raw else None
+
+
+def _is_fresh(csv_path, cache_path):
+    cached = _cached_fingerprint(cache_path)
+    if cached is None:
+        return False
+    current = _fingerprint(csv_path, with_hash=False)
+    if (cached["mtime_ns"], cached["size"]) == (current["mtime_ns"], current["size"]):
+        return True
+    # Touched but maybe not changed (checkout, copy): fall back to the content hash
+    return current["size"] == cached["size"] and _file_hash(csv_path) == cached["sha256"]
+
+
+def build_cache(csv_path, cache_path=None):
+    """Converts the CSV once into an uncompressed Arrow IPC file (memory-mappable)."""
+    cache_path = cache_path or cache_path_for(csv_path)
+    fingerprint = _fingerprint(csv_path)
+    table = pa.Table.from_pandas(read_flight_csv(csv_path), preserve_index=False)
+    table = table.replace_schema_metadata({
+        **(table.schema.metadata or {}),
+        _META_KEY: json.dumps(fingerprint).encode(),
+    })
+    tmp_path = cache_path + ".tmp"
+    feather.write_feather(table, tmp_path, compression="uncompressed")
+    os.replace(tmp_path, cache_path)
+    return cache_path
+
+
+def load_flight_prices(csv_path, columns=None, use_cache=True):
+    """
+    Loads flight_data_prices.csv with typed columns.
+
+    The first call writes a .arrow file next to the CSV; later calls
+    memory-map it and read only `columns`. The cache is rebuilt when the CSV's
+    mtime/size change and its content hash no longer matches. Without pyarrow
+    this falls back to a typed CSV parse.
+    """
+    if not use_cache or pa is None:
+        return read_flight_csv(csv_path, columns)
+
+    cache_path = cache_path_for(csv_path)
+    if not _is_fresh(csv_path, cache_path):
+        print(f"Building dataset cache {os.path.basename(cache_path)}...")
+        build_cache(csv_path, cache_path)
+    return feather.read_table(cache_path, columns=columns, memory_map=True).to_pandas()
@@ -1,37 +1,56 @@
 import pandas as pd
 import numpy as np
 import joblib
+import argparse
+import os
+import sys
 from sklearn.preprocessing import LabelEncoder, StandardScaler
 from sklearn.model_selection import train_test_split
 from sklearn.neighbors import KNeighborsClassifier
 
+# The serving-side engine lives next to main.py so the pickle resolves there too
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from severity_index import IndexedSeverityModel
+from encoding import compile_encoders
+from dataset import load_flight_prices
+from drift import PROFILE_FILES, training_profile, write_profile
+
+# predict() request field -> encoder name (same pairs as the server's SEVERITY_FIELDS)
+PREDICT_FIELDS = [
+    ("Airline", "airline"), ("Departure_Airport", "departure"),
+    ("Arrival_Airport", "arrival"), ("Flight_Status", "status")
+]
+
+# Only these columns are read from the dataset cache
+TRAINING_COLUMNS = [
+    "Airline", "Departure_Airport", "Arrival_Airport", "Departure_Time",
+    "Flight_Status", "Delay_Minutes"
+]
+
 
 class SimpleFlightDelayModel:
-    def __init__(self):
+    def __init__(self, unknown=None):
         # Will be filled during training or loading
         self.model = None
         self.scaler = None
         self.encoders = {}
+        self.tables = None
+        # predict(): fallback code for unseen labels (int or {encoder: code}); None rejects them
+        self.unknown = unknown
         self.feature_order = [
             "Dep_Hour", "Dep_Day", "Dep_Month", "Dep_Weekday",
             "Airline_Encoded", "Departure_Encoded", "Arrival_Encoded", "Status_Encoded"
         ]
 
     # -------------------------------------------------------
-    # 1. TRAIN MODEL (Run: python model.py)
+    # 0. FEATURES (shared with the sweep harness)
     # -------------------------------------------------------
-    def train(self, dataset_path="../dataset/flight_data_prices.csv"):
+    def build_features(self, df):
         """
-        Train the KNN model using your full dataset.
-        Will generate delay_severity_model.pkl.
+        Fits the label encoders and returns (X, y) in feature_order.
+        Departure_Time must already be datetime64 (see dataset.py).
         """
 
-        print("Loading dataset...")
-        df = pd.read_csv(dataset_path)
-
-        print("Columns found in dataset:", df.columns.tolist())
-
-
         # Convert flight delay minutes into categories
         def categorize_delay(m):
             if m == 0: return "No Delay"
@@ -52,17 +71,31 @@ class SimpleFlightDelayModel:
         df["Arrival_Encoded"] = self.encoders["arrival"].fit_transform(df["Arrival_Airport"])
         df["Status_Encoded"] = self.encoders["status"].fit_transform(df["Flight_Status"])
 
-        # Convert datetime
         print("Processing datetime...")
-        df["Departure_Time"] = pd.to_datetime(df["Departure_Time"], format="%d/%m/%Y %H:%M", errors="coerce")
         df["Dep_Hour"] = df["Departure_Time"].dt.hour
         df["Dep_Day"] = df["Departure_Time"].dt.day
         df["Dep_Month"] = df["Departure_Time"].dt.month
         df["Dep_Weekday"] = df["Departure_Time"].dt.dayofweek
 
-        # Select features
-        X = df[self.feature_order]
-        y = df["Delay_Severity"]
+        return df[self.feature_order], df["Delay_Severity"]
+
+    # -------------------------------------------------------
+    # 1. TRAIN MODEL (Run: python model.py)
+    # -------------------------------------------------------
+    def train(self, dataset_path="../dataset/flight_data_prices.csv", engine="indexed"):
+        """
+        Train the KNN model using your full dataset.
+        Will generate delay_severity_model.pkl.
+
+        engine="indexed" stores an IndexedSeverityModel (deduplicated KD-tree,
+        memory-mappable); engine="knn" keeps the plain KNeighborsClassifier.
+        """
+
+        print("Loading dataset...")
+        df = load_flight_prices(dataset_path, columns=TRAINING_COLUMNS)
+
+        print("Columns found in dataset:", df.columns.tolist())
+        X, y = self.build_features(df)
 
         # Split dataset
         print("Training model...")
@@ -75,7 +108,10 @@ class SimpleFlightDelayModel:
         X_train_scaled = self.scaler.fit_transform(X_train)
 
         # Train model
-        self.model = KNeighborsClassifier(n_neighbors=5)
+        if engine == "indexed":
+            self.model = IndexedSeverityModel(n_neighbors=5)
+        else:
+            self.model = KNeighborsClassifier(n_neighbors=5)
         self.model.fit(X_train_scaled, y_train)
 
         # Save everything in ONE FILE
@@ -83,10 +119,22 @@ class SimpleFlightDelayModel:
             "model": self.model,
             "scaler": self.scaler,
             "encoders": self.encoders,
-            "feature_order": self.feature_order
+            "feature_order": self.feature_order,
+            # What the server's drift monitor compares live traffic against
+            "profile": training_profile(
+                {field: df[field] for field in ["Airline", "Departure_Airport", "Arrival_Airport",
+                                                "Flight_Status", "Dep_Hour", "Dep_Month"]},
+                y,
+            ),
         }
 
-        joblib.dump(bundle, "delay_severity_model.pkl")
+        # Uncompressed on purpose: the server memory-maps the arrays on load.
+        # Never rewrite the live file in place: a server still mapping it would
+        # die with SIGBUS. Write a new file and rename it over the old one.
+        joblib.dump(bundle, "delay_severity_model.pkl.tmp")
+        os.replace("delay_severity_model.pkl.tmp", "delay_severity_model.pkl")
+        # The drift reference for processes that never load the model
+        write_profile(bundle["profile"], PROFILE_FILES["severity"])
         print("delay_severity_model.pkl created successfully!")
 
     # -------------------------------------------------------
@@ -96,14 +144,30 @@ class SimpleFlightDelayModel:
         """
         Used by FastAPI to make predictions.
         Loads trained model + preprocess input.
+
+        Labels are encoded through the same compiled tables as the server.
+        Unseen labels get self.unknown; without a fallback the result is
+        {"error": ...} naming the unseen fields.
         """
 
-        # Load bundle file
-        bundle = joblib.load("delay_severity_model.pkl")
-        model = bundle["model"]
-        scaler = bundle["scaler"]
-        enc = bundle["encoders"]
-        feature_order = bundle["feature_order"]
+        # Load bundle file and compile its encoders, once
+        if self.tables is None:
+            bundle = joblib.load("delay_severity_model.pkl")
+            self.model = bundle["model"]
+            self.scaler = bundle["scaler"]
+            self.encoders = bundle["encoders"]
+            self.feature_order = bundle["feature_order"]
+            self.tables = compile_encoders(self.encoders, self.unknown)
+        model = self.model
+        scaler = self.scaler
+        feature_order = self.feature_order
+        tables = self.tables
+
+        codes = {field: tables[name].code(data[field]) for field, name in PREDICT_FIELDS}
+        unseen = [field for field, code in codes.items() if code is None]
+        if unseen:
+            return {"error": "Value not found in training data: " + ", ".join(
+                f"{field}={data[field]!r}" for field in unseen)}
 
         # Extract datetime
         dt = pd.to_datetime(data["Departure_Time"], errors="coerce")
@@ -114,10 +178,10 @@ class SimpleFlightDelayModel:
             "Dep_Day": dt.day,
             "Dep_Month": dt.month,
             "Dep_Weekday": dt.dayofweek,
-            "Airline_Encoded": enc["airline"].transform([data["Airline"]])[0],
-            "Departure_Encoded": enc["departure"].transform([data["Departure_Airport"]])[0],
-            "Arrival_Encoded": enc["arrival"].transform([data["Arrival_Airport"]])[0],
-            "Status_Encoded": enc["status"].transform([data["Flight_Status"]])[0],
+            "Airline_Encoded": codes["Airline"],
+            "Departure_Encoded": codes["Departure_Airport"],
+            "Arrival_Encoded": codes["Arrival_Airport"],
+            "Status_Encoded": codes["Flight_Status"],
         }])
 
         # Scale features
@@ -140,6 +204,11 @@ class SimpleFlightDelayModel:
 # TRAIN MODEL ONLY WHEN RUN DIRECTLY
 # -------------------------------------------------------
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the Chart 3 delay severity model.")
+    parser.add_argument("--dataset", default="../dataset/flight_data_prices.csv")
+    parser.add_argument("--engine", choices=["indexed", "knn"], default="indexed")
+    args = parser.parse_args()
+
     trainer = SimpleFlightDelayModel()
-    trainer.train(r"../data/flight_data_prices.csv")
+    trainer.train(args.dataset, engine=args.engine)
 
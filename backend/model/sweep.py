@@ -0,0 +1,192 @@
+"""
+Hyperparameter sweep for both models across a process pool.
+
+Each chart's train/test split is prepared once in the parent, written as
+.npy files and memory-mapped read-only by every worker, so configurations
+run in parallel without pickling or copying the data. Every configuration
+reports accuracy next to fit time, single-row predict latency and pickle
+size, so the chosen model is cheap to serve, not only accurate.
+
+Chart 3 sweeps the engine the server ships, IndexedSeverityModel (what
+delay_severity_model.py trains by default), over k and KD-tree leaf size.
+--engine knn sweeps the plain KNeighborsClassifier over k, weights and
+metric instead; the indexed engine only does uniform euclidean votes.
+
+    python sweep.py --chart 2 --trees 50 100 200 --depths 6 10 0
+    python sweep.py --chart 3 --k 3 5 11 --leaf-sizes 20 40 80
+    python sweep.py --chart 3 --engine knn --k 3 5 11 --weights uniform distance --metrics euclidean manhattan
+"""
+import argparse
+import itertools
+import json
+import os
+import pickle
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+from sklearn.ensemble import RandomForestClassifier
+from sklearn.model_selection import train_test_split
+from sklearn.neighbors import KNeighborsClassifier
+from sklearn.preprocessing import StandardScaler
+
+import train_modelbc
+from dataset import load_flight_prices
+from delay_severity_model import SimpleFlightDelayModel, TRAINING_COLUMNS
+# Importable once delay_severity_model has put the backend on sys.path
+from severity_index import IndexedSeverityModel
+
+LATENCY_REPEATS = 50
+
+
+# -------------------------------------------------------
+# DATA (parent process only)
+# -------------------------------------------------------
+def _save_split(data_dir, chart, X_train, X_test, y_train, y_test):
+    for name, array in (("X_train", X_train), ("X_test", X_test), ("y_train", y_train), ("y_test", y_test)):
+        np.save(os.path.join(data_dir, f"chart{chart}_{name}.npy"), np.ascontiguousarray(array))
+
+
+def prepare_chart2(data_dir, bts_path, chunksize=None):
+    print(f"Preparing Chart 2 data from {bts_path}...")
+    df_trainable = train_modelbc.trainable_from_aggregates(
+        train_modelbc.load_aggregates(bts_path, chunksize=chunksize)
+    )
+    train_modelbc.label_trainable(df_trainable)
+    y = df_trainable['HighWeatherImpact_Class'].to_numpy()
+    X = df_trainable.drop(columns=train_modelbc.TARGET_COLUMNS)
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    # The preprocessor is not swept: transform once, share the dense matrices
+    preprocessor = train_modelbc.build_pipeline().named_steps['preprocessor']
+    _save_split(data_dir, 2, preprocessor.fit_transform(X_train), preprocessor.transform(X_test), y_train, y_test)
+
+
+def prepare_chart3(data_dir, dataset_path):
+    print(f"Preparing Chart 3 data from {dataset_path}...")
+    df = load_flight_prices(dataset_path, columns=TRAINING_COLUMNS)
+    X, y = SimpleFlightDelayModel().build_features(df)
+    y = y.to_numpy().astype(str)
+
+    X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42, stratify=y)
+    scaler = StandardScaler()
+    _save_split(data_dir, 3, scaler.fit_transform(X_train), scaler.transform(X_test), y_train, y_test)
+
+
+# -------------------------------------------------------
+# WORKER
+# -------------------------------------------------------
+def _load_split(data_dir, chart):
+    return [
+        np.load(os.path.join(data_dir, f"chart{chart}_{name}.npy"), mmap_mode="r")
+        for name in ("X_train", "X_test", "y_train", "y_test")
+    ]
+
+
+def make_estimator(chart, params):
+    if chart == 2:
+        return RandomForestClassifier(
+            n_estimators=params["n_estimators"], max_depth=params["max_depth"],
+            random_state=42, class_weight='balanced', n_jobs=1
+        )
+    if params["engine"] == "indexed":
+        return IndexedSeverityModel(n_neighbors=params["n_neighbors"], leaf_size=params["leaf_size"])
+    return KNeighborsClassifier(
+        n_neighbors=params["n_neighbors"], weights=params["weights"], metric=params["metric"]
+    )
+
+
+def run_config(task):
+    chart, params, data_dir = task["chart"], task["params"], task["data_dir"]
+    X_train, X_test, y_train, y_test = _load_split(data_dir, chart)
+    model = make_estimator(chart, params)
+
+    start = time.perf_counter()
+    model.fit(X_train, y_train)
+    fit_s = time.perf_counter() - start
+
+    accuracy = float((model.predict(X_test) == y_test).mean())
+
+    row = np.asarray(X_test[:1])
+    samples = []
+    for _ in range(LATENCY_REPEATS):
+        start = time.perf_counter()
+        model.predict_proba(row)
+        samples.append(time.perf_counter() - start)
+
+    return {
+        "chart": chart,
+        "params": params,
+        "accuracy": accuracy,
+        "fit_s": fit_s,
+        "predict_ms": float(np.median(samples) * 1e3),
+        "pickle_bytes": len(pickle.dumps(model, protocol=pickle.HIGHEST_PROTOCOL)),
+    }
+
+
+# -------------------------------------------------------
+# CLI
+# -------------------------------------------------------
+def build_tasks(args, data_dir):
+    tasks = []
+    if args.chart in ("2", "both"):
+        for trees, depth in itertools.product(args.trees, args.depths):
+            params = {"n_estimators": trees, "max_depth": depth or None}
+            tasks.append({"chart": 2, "params": params, "data_dir": data_dir})
+    if args.chart in ("3", "both") and args.engine == "indexed":
+        for k, leaf_size in itertools.product(args.k, args.leaf_sizes):
+            params = {"engine": "indexed", "n_neighbors": k, "leaf_size": leaf_size}
+            tasks.append({"chart": 3, "params": params, "data_dir": data_dir})
+    elif args.chart in ("3", "both"):
+        for k, weights, metric in itertools.product(args.k, args.weights, args.metrics):
+            params = {"engine": "knn", "n_neighbors": k, "weights": weights, "metric": metric}
+            tasks.append({"chart": 3, "params": params, "data_dir": data_dir})
+    return tasks
+
+
+def print_report(results):
+    print(f"\n{'chart':>5}  {'params':<64} {'accuracy':>8} {'fit s':>8} {'pred ms':>8} {'pickle KB':>10}")
+    for r in sorted(results, key=lambda r: (r["chart"], -r["accuracy"], r["predict_ms"])):
+        params = ", ".join(f"{k}={v}" for k, v in r["params"].items())
+        print(f"{r['chart']:>5}  {params:<64} {r['accuracy']:>8.4f} {r['fit_s']:>8.2f} "
+              f"{r['predict_ms']:>8.3f} {r['pickle_bytes'] / 1024:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--chart", choices=["2", "3", "both"], default="both")
+    parser.add_argument("--bts", default="Airline_Delay_Cause (1).csv", help="Chart 2 source CSV")
+    parser.add_argument("--dataset", default="../dataset/flight_data_prices.csv", help="Chart 3 source CSV")
+    parser.add_argument("--chunksize", type=int, default=None, help="stream the Chart 2 CSV")
+    parser.add_argument("--trees", type=int, nargs="+", default=[50, 100, 200])
+    parser.add_argument("--depths", type=int, nargs="+", default=[6, 10, 0], help="0 = unlimited")
+    parser.add_argument("--engine", choices=["indexed", "knn"], default="indexed",
+                        help="Chart 3 engine, as in delay_severity_model.py --engine")
+    parser.add_argument("--k", type=int, nargs="+", default=[3, 5, 11])
+    parser.add_argument("--leaf-sizes", type=int, nargs="+", default=[20, 40, 80], help="indexed engine only")
+    parser.add_argument("--weights", nargs="+", default=["uniform", "distance"], help="knn engine only")
+    parser.add_argument("--metrics", nargs="+", default=["euclidean", "manhattan"], help="knn engine only")
+    parser.add_argument("--workers", type=int, default=os.cpu_count())
+    parser.add_argument("--json", help="write results to this file")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory(prefix="sweep-") as data_dir:
+        if args.chart in ("2", "both"):
+            prepare_chart2(data_dir, args.bts, args.chunksize)
+        if args.chart in ("3", "both"):
+            prepare_chart3(data_dir, args.dataset)
+
+        tasks = build_tasks(args, data_dir)
+        print(f"Running {len(tasks)} configurations on {args.workers} workers...")
+        with ProcessPoolExecutor(max_workers=args.workers) as pool:
+            results = list(pool.map(run_config, tasks))
+
+    print_report(results)
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
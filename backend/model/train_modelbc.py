@@ -5,68 +5,186 @@ from sklearn.preprocessing import StandardScaler, OneHotEncoder
 from sklearn.compose import ColumnTransformer
 from sklearn.pipeline import Pipeline
 import joblib
+import argparse
+import json
 import os
+import re
+import sys
+import uuid
 
-def train_and_save():
-    file_path = 'Airline_Delay_Cause (1).csv'
-    output_file = 'flight_model.pkl'
-    
-    if not os.path.exists(file_path):
-        print(f"Error: {file_path} not found.")
-        return
+# Flat-array export lives next to main.py, which loads it
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from compiled_forest import ARRAYS_FILE, export_flight_model
+from drift import PROFILE_FILES, training_profile, write_profile
+from route_cube import CUBE_FILE, RouteCube
+
+TARGET_COLUMNS = ['HighWeatherImpact_Class', 'WeatherDelayProportion']
+# Competitors kept per (airport, month); one spare so the asking carrier can be skipped
+TABLE_COMPETITORS = 4
+
+COLUMN_RENAMES = {
+    'Numberofarrivingflights': 'TotalFlights',
+    'Numberofflightsdelayedby15minutesormore': 'TotalDelayedFlights',
+    'Weathercountdelayduetoweather': 'WeatherDelayCount',
+    'Delayattributedtoweather': 'DelayAttributedToWeatherMinutes'
+}
+NUMERIC_COLUMNS = ['TotalFlights', 'TotalDelayedFlights', 'WeatherDelayCount',
+                   'Totalarrivaldelay', 'DelayAttributedToWeatherMinutes', 'month']
+GROUP_KEYS = ['carrier', 'airport', 'month']
+FEATURES_TO_AVERAGE = [
+    'WeatherDelayProportion', 'WeatherMinuteProportion',
+    'TotalFlights', 'WeatherDelayCount', 'TotalDelayedFlights'
+]
+
+
+def clean_column_name(name):
+    name = re.sub('[^A-Za-z0-9_]+', '', name)
+    return COLUMN_RENAMES.get(name, name)
 
-    print("1. Loading Data...")
-    df = pd.read_csv(file_path)
 
+def prepare_rows(df):
+    """Numeric coercion, row filtering and the two weather proportions."""
     # --- DATA CLEANING ---
-    df.columns = df.columns.str.replace('[^A-Za-z0-9_]+', '', regex=True)
-    df = df.rename(columns={
-        'Numberofarrivingflights': 'TotalFlights',
-        'Numberofflightsdelayedby15minutesormore': 'TotalDelayedFlights',
-        'Weathercountdelayduetoweather': 'WeatherDelayCount',
-        'Delayattributedtoweather': 'DelayAttributedToWeatherMinutes'
-    })
-    
-    cols = ['TotalFlights', 'TotalDelayedFlights', 'WeatherDelayCount', 
-            'Totalarrivaldelay', 'DelayAttributedToWeatherMinutes', 'month']
-    for col in cols:
-        df[col] = pd.to_numeric(df[col], errors='coerce')
-    df = df.dropna(subset=cols).copy()
+    for col in NUMERIC_COLUMNS:
+        df[col] = pd.to_numeric(df[col], errors='coerce').astype(np.float64)
+    df = df.dropna(subset=NUMERIC_COLUMNS + ['carrier', 'airport']).copy()
+    df['month'] = df['month'].astype(np.int64)
 
     # --- FEATURE ENGINEERING ---
     df['WeatherDelayProportion'] = np.where(
-        df['TotalDelayedFlights'] > 0, 
-        df['WeatherDelayCount'] / df['TotalDelayedFlights'], 
+        df['TotalDelayedFlights'] > 0,
+        df['WeatherDelayCount'] / df['TotalDelayedFlights'],
         0
     )
     df['WeatherMinuteProportion'] = np.where(
-        df['Totalarrivaldelay'] > 0, 
-        df['DelayAttributedToWeatherMinutes'] / df['Totalarrivaldelay'], 
+        df['Totalarrivaldelay'] > 0,
+        df['DelayAttributedToWeatherMinutes'] / df['Totalarrivaldelay'],
         0
     )
+    return df
 
-    # --- EXTRACT METADATA (For Dropdowns) ---
-    unique_carriers = sorted(df['carrier'].dropna().unique().tolist())
-    unique_airports = sorted(df['airport'].dropna().unique().tolist())
-    print(f"   Found {len(unique_carriers)} carriers and {len(unique_airports)} airports.")
 
-    # --- AGGREGATION ---
-    features_to_average = [
-        'WeatherDelayProportion', 'WeatherMinuteProportion', 
-        'TotalFlights', 'WeatherDelayCount', 'TotalDelayedFlights'
-    ]
-    df_trainable = df.groupby(['carrier', 'airport', 'month'])[features_to_average].mean().reset_index()
+def aggregate_rows(df):
+    """Per-(carrier, airport, month) feature sums plus a row count."""
+    df = df.astype({'carrier': str, 'airport': str})
+    grouped = df.groupby(GROUP_KEYS, observed=True)
+    aggregates = grouped[FEATURES_TO_AVERAGE].sum()
+    aggregates['count'] = grouped.size()
+    return aggregates
 
-    # --- TARGET DEFINITION ---
+
+def merge_aggregates(left, right):
+    """Sums and counts add, so chunks (or monthly files) combine exactly."""
+    if left is None:
+        return right
+    return left.add(right, fill_value=0)
+
+
+def load_aggregates(file_path, chunksize=None):
+    """
+    Reads the BTS delay-cause CSV into per-group sums and counts.
+
+    With chunksize set the file is streamed with categorical/float32 dtypes,
+    so peak memory follows the number of groups rather than the number of rows.
+    """
+    if not chunksize:
+        df = pd.read_csv(file_path)
+        df.columns = [clean_column_name(c) for c in df.columns]
+        return aggregate_rows(prepare_rows(df))
+
+    header = pd.read_csv(file_path, nrows=0).columns
+    wanted = set(NUMERIC_COLUMNS) | {'carrier', 'airport'}
+    source = {c: clean_column_name(c) for c in header if clean_column_name(c) in wanted}
+    dtypes = {c: ('category' if name in ('carrier', 'airport') else np.float32) for c, name in source.items()}
+
+    aggregates = None
+    for chunk in pd.read_csv(file_path, usecols=list(source), dtype=dtypes, chunksize=chunksize):
+        chunk = chunk.rename(columns=source)
+        aggregates = merge_aggregates(aggregates, aggregate_rows(prepare_rows(chunk)))
+    return aggregates
+
+
+def trainable_from_aggregates(aggregates):
+    """Group means from sums/counts: the same table groupby(...).mean() gives."""
+    means = aggregates[FEATURES_TO_AVERAGE].div(aggregates['count'], axis=0)
+    return means.reset_index()
+
+
+def build_prediction_table(pipeline, df_trainable, carriers, airports, threshold, build_id):
+    """
+    Scores every (carrier, airport, month) row in one predict_proba call and
+    packs the answers, 12-month trends and competitor lists into flat arrays.
+    """
+    X = df_trainable.drop(columns=TARGET_COLUMNS)
+    probs = pipeline.predict_proba(X)
+    classes = pipeline.classes_
+    risk_class = classes[probs.argmax(axis=1)].astype(np.int8)
+    confidence = probs[:, list(classes).index(1)]
+
+    carrier_code = pd.Categorical(df_trainable['carrier'], categories=carriers).codes.astype(np.int32)
+    airport_code = pd.Categorical(df_trainable['airport'], categories=airports).codes.astype(np.int32)
+    month = df_trainable['month'].to_numpy().astype(np.int8)
+    prop = df_trainable['WeatherDelayProportion'].to_numpy(dtype=np.float64)
+    volume = df_trainable['TotalFlights'].to_numpy(dtype=np.float64)
+
+    # 12-month trend per (carrier, airport); months with no data stay 0
+    route = carrier_code * len(airports) + airport_code
+    routes, route_idx = np.unique(route, return_inverse=True)
+    trend_risk = np.zeros((len(routes), 12))
+    trend_volume = np.zeros((len(routes), 12))
+    trend_risk[route_idx, month - 1] = prop
+    trend_volume[route_idx, month - 1] = volume
+
+    # Lowest-risk carriers per (airport, month)
+    slot = airport_code * 12 + (month - 1)
+    order = np.lexsort((prop, slot))
+    sorted_slot = slot[order]
+    slots, starts = np.unique(sorted_slot, return_index=True)
+    slot_idx = np.searchsorted(slots, sorted_slot)
+    rank = np.arange(len(order)) - starts[slot_idx]
+    keep = rank < TABLE_COMPETITORS
+    comp_carrier = np.full((len(slots), TABLE_COMPETITORS), -1, dtype=np.int32)
+    comp_risk = np.zeros((len(slots), TABLE_COMPETITORS))
+    comp_volume = np.zeros((len(slots), TABLE_COMPETITORS))
+    comp_carrier[slot_idx[keep], rank[keep]] = carrier_code[order][keep]
+    comp_risk[slot_idx[keep], rank[keep]] = prop[order][keep]
+    comp_volume[slot_idx[keep], rank[keep]] = volume[order][keep]
+
+    mean_row = df_trainable.mean(numeric_only=True)
+
+    return {
+        "build_id": np.array(build_id),
+        "threshold": np.array(threshold, dtype=np.float64),
+        "carriers": np.array(carriers, dtype=str),
+        "airports": np.array(airports, dtype=str),
+        "carrier_code": carrier_code,
+        "airport_code": airport_code,
+        "month": month,
+        "risk_class": risk_class,
+        "confidence_high_risk": confidence,
+        "historical_weather_prop": prop,
+        "trend_carrier": (routes // len(airports)).astype(np.int32),
+        "trend_airport": (routes % len(airports)).astype(np.int32),
+        "trend_risk": trend_risk,
+        "trend_volume": trend_volume,
+        "comp_airport": (slots // 12).astype(np.int32),
+        "comp_month": (slots % 12 + 1).astype(np.int8),
+        "comp_carrier": comp_carrier,
+        "comp_risk": comp_risk,
+        "comp_volume": comp_volume,
+        "mean_row_columns": np.array(mean_row.index.tolist(), dtype=str),
+        "mean_row_values": mean_row.to_numpy(dtype=np.float64),
+    }
+
+
+def label_trainable(df_trainable):
+    """Top-quartile weather proportion is the high-risk class."""
     threshold = df_trainable['WeatherDelayProportion'].quantile(0.75)
     df_trainable['HighWeatherImpact_Class'] = (df_trainable['WeatherDelayProportion'] >= threshold).astype(int)
-    
-    print(f"2. Training Random Forest (Threshold: {threshold:.4f})...")
+    return threshold
 
-    # --- TRAINING ---
-    y = df_trainable['HighWeatherImpact_Class']
-    X = df_trainable.drop(columns=['HighWeatherImpact_Class', 'WeatherDelayProportion'])
 
+def build_pipeline(n_estimators=200, max_depth=10):
     preprocessor = ColumnTransformer(
         transformers=[
             ('num', StandardScaler(), ['WeatherMinuteProportion', 'TotalFlights', 'WeatherDelayCount', 'TotalDelayedFlights']),
@@ -75,27 +193,181 @@ def train_and_save():
         remainder='drop'
     )
 
-    pipeline = Pipeline([
+    return Pipeline([
         ('preprocessor', preprocessor),
-        ('classifier', RandomForestClassifier(n_estimators=200, random_state=42, class_weight='balanced', max_depth=10))
+        ('classifier', RandomForestClassifier(n_estimators=n_estimators, random_state=42, class_weight='balanced', max_depth=max_depth))
     ])
 
-    pipeline.fit(X, y)
 
+def write_options(carriers, airports, build_id, options_file):
+    # Tiny sidecar so the server can answer /options before the model is loaded
+    tmp_file = options_file + '.tmp'
+    with open(tmp_file, 'w') as f:
+        json.dump({"carriers": carriers, "airports": airports, "build_id": build_id}, f)
+    os.replace(tmp_file, options_file)
+
+
+def save_package(pipeline, df_trainable, aggregates, threshold, precompute, arrays=False,
+                 output_file='flight_model.pkl', table_file='flight_predictions.npz'):
     # --- SAVING EVERYTHING TO ONE FILE ---
     # We need to save the model, but also the historical averages (avg_df) for the charts
-    # and the lists for the dropdowns.
+    # and the lists for the dropdowns. build_id ties a precomputed table to this model.
+    # group_aggregates keeps sums/counts so monthly files can be merged in later.
+    unique_carriers = sorted(df_trainable['carrier'].unique().tolist())
+    unique_airports = sorted(df_trainable['airport'].unique().tolist())
+    build_id = uuid.uuid4().hex
     model_package = {
         "pipeline": pipeline,
         "avg_df": df_trainable,
         "threshold": threshold,
         "carriers": unique_carriers,
-        "airports": unique_airports
+        "airports": unique_airports,
+        "build_id": build_id,
+        "group_aggregates": aggregates.reset_index(),
+        # Weighted by source rows, in the same order as df_trainable; compared against live traffic
+        "profile": training_profile(
+            {column: df_trainable[column] for column in GROUP_KEYS},
+            df_trainable['HighWeatherImpact_Class'],
+            weights=aggregates['count'].to_numpy(),
+        ),
     }
 
+    if precompute:
+        print(f"   Precomputing {len(df_trainable)} predictions to {table_file}...")
+        table = build_prediction_table(pipeline, df_trainable, unique_carriers, unique_airports, threshold, build_id)
+        np.savez(table_file, **table)
+    elif os.path.exists(table_file):
+        # A stale table would never match the new build_id; drop it
+        os.remove(table_file)
+
+    # Dense (carrier, airport, month) arrays for the dashboard slice queries
+    cube = RouteCube.from_avg_df(df_trainable, unique_carriers, unique_airports)
+    np.savez(os.path.join(os.path.dirname(output_file), CUBE_FILE), **cube.to_arrays(build_id))
+
     print(f"3. Saving to {output_file}...")
     joblib.dump(model_package, output_file)
+    write_options(unique_carriers, unique_airports, build_id,
+                  os.path.join(os.path.dirname(output_file), 'flight_options.json'))
+    # The drift reference for processes that never load the model
+    write_profile(model_package["profile"], os.path.join(os.path.dirname(output_file), PROFILE_FILES["flight"]))
+
+    # The server prefers the array file, so it must never lag behind the pickle
+    arrays_file = os.path.join(os.path.dirname(output_file), ARRAYS_FILE)
+    if arrays:
+        print(f"   Exporting flat arrays to {arrays_file}...")
+        export_flight_model(model_package, arrays_file)
+    elif os.path.exists(arrays_file):
+        os.remove(arrays_file)
+
+
+def train_and_save(precompute=False, chunksize=None, arrays=False):
+    file_path = 'Airline_Delay_Cause (1).csv'
+    
+    if not os.path.exists(file_path):
+        print(f"Error: {file_path} not found.")
+        return
+
+    print("1. Loading Data..." + (f" (streaming, {chunksize} rows per chunk)" if chunksize else ""))
+    aggregates = load_aggregates(file_path, chunksize=chunksize)
+    df_trainable = trainable_from_aggregates(aggregates)
+    print(f"   Found {df_trainable['carrier'].nunique()} carriers and {df_trainable['airport'].nunique()} airports.")
+
+    # --- TARGET DEFINITION ---
+    threshold = label_trainable(df_trainable)
+    
+    print(f"2. Training Random Forest (Threshold: {threshold:.4f})...")
+
+    # --- TRAINING ---
+    y = df_trainable['HighWeatherImpact_Class']
+    X = df_trainable.drop(columns=TARGET_COLUMNS)
+
+    pipeline = build_pipeline()
+    pipeline.fit(X, y)
+
+    save_package(pipeline, df_trainable, aggregates, threshold, precompute, arrays)
     print("Done! You can now run the server.")
 
+
+def _has_new_categories(pipeline, X):
+    onehot = pipeline.named_steps['preprocessor'].named_transformers_['cat']
+    return any(
+        not np.isin(X[col].unique(), categories).all()
+        for col, categories in zip(['month', 'carrier', 'airport'], onehot.categories_)
+    )
+
+
+def update_incremental(new_file, model_file='flight_model.pkl', table_file='flight_predictions.npz',
+                       tolerance=0.02, warm_start_trees=0, chunksize=None):
+    """
+    Folds one new monthly BTS file into an existing flight_model.pkl.
+
+    Group sums/counts are merged, means and the 75th-percentile threshold are
+    recomputed, and the forest is only touched when the share of groups whose
+    label changed (or that are new) exceeds `tolerance`. With warm_start_trees
+    the forest grows that many extra trees instead of a full refit, as long as
+    no new carrier/airport/month appeared (the one-hot layout must not change).
+    """
+    if not os.path.exists(new_file):
+        print(f"Error: {new_file} not found.")
+        return
+
+    pkg = joblib.load(model_file)
+    if "group_aggregates" not in pkg:
+        print(f"Error: {model_file} has no group_aggregates; run a full train_and_save once first.")
+        return
+
+    print(f"1. Merging {new_file} into stored aggregates...")
+    stored = pkg["group_aggregates"].set_index(GROUP_KEYS)
+    aggregates = merge_aggregates(stored, load_aggregates(new_file, chunksize=chunksize))
+    df_trainable = trainable_from_aggregates(aggregates)
+    threshold = label_trainable(df_trainable)
+
+    # --- LABEL DRIFT CHECK ---
+    previous = pkg["avg_df"][GROUP_KEYS + ['HighWeatherImpact_Class']]
+    compared = df_trainable.merge(previous, on=GROUP_KEYS, how='left', suffixes=('', '_previous'))
+    changed = (compared['HighWeatherImpact_Class'] != compared['HighWeatherImpact_Class_previous']).mean()
+    print(f"2. Threshold {pkg['threshold']:.4f} -> {threshold:.4f}; {changed:.2%} of groups changed label")
+
+    pipeline = pkg["pipeline"]
+    y = df_trainable['HighWeatherImpact_Class']
+    X = df_trainable.drop(columns=TARGET_COLUMNS)
+    if changed <= tolerance:
+        print(f"   Within tolerance ({tolerance:.2%}), keeping the current forest.")
+    elif warm_start_trees and not _has_new_categories(pipeline, X):
+        forest = pipeline.named_steps['classifier']
+        print(f"   Warm-starting {warm_start_trees} extra trees...")
+        forest.set_params(warm_start=True, n_estimators=forest.n_estimators + warm_start_trees)
+        forest.fit(pipeline.named_steps['preprocessor'].transform(X), y)
+        forest.set_params(warm_start=False)
+    else:
+        print("   Refitting the Random Forest...")
+        pipeline = build_pipeline()
+        pipeline.fit(X, y)
+
+    arrays_file = os.path.join(os.path.dirname(model_file), ARRAYS_FILE)
+    save_package(pipeline, df_trainable, aggregates, threshold,
+                 precompute=os.path.exists(table_file), arrays=os.path.exists(arrays_file),
+                 output_file=model_file, table_file=table_file)
+    print("Done! The server will pick up the new model automatically.")
+
+
 if __name__ == "__main__":
-    train_and_save()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="Train the Chart 2 weather-risk model.")
+    parser.add_argument("--precompute", action="store_true",
+                        help="also score every (carrier, airport, month) into flight_predictions.npz")
+    parser.add_argument("--chunksize", type=int, default=None,
+                        help="stream the CSV in chunks of this many rows (bounded memory)")
+    parser.add_argument("--arrays", action="store_true",
+                        help=f"also export {ARRAYS_FILE}, the fast-loading memory-mappable format")
+    parser.add_argument("--update", metavar="MONTHLY_CSV",
+                        help="merge one new monthly file into flight_model.pkl instead of retraining")
+    parser.add_argument("--tolerance", type=float, default=0.02,
+                        help="with --update: share of changed labels that triggers a refit")
+    parser.add_argument("--warm-start-trees", type=int, default=0,
+                        help="with --update: grow this many trees instead of refitting from scratch")
+    args = parser.parse_args()
+    if args.update:
+        update_incremental(args.update, tolerance=args.tolerance,
+                           warm_start_trees=args.warm_start_trees, chunksize=args.chunksize)
+    else:
+        train_and_save(precompute=args.precompute, chunksize=args.chunksize, arrays=args.arrays)
@@ -0,0 +1,212 @@
+"""
+Prefork server: one parent process loads every model, forked workers share it.
+
+    python prefork.py --workers 4 --port 8000
+
+Running `uvicorn --workers N` makes each worker load its own copy of avg_df,
+the indexes, the route cube and the forest, so memory grows with N. Here the
+parent loads the registry once, freezes the GC (so workers never write to the
+inherited objects' headers) and forks the workers, which serve main.app on
+the parent's listening socket. The models stay copy-on-write shared pages,
+and the flight arrays file and the severity arrays stay memory-mapped, so N
+workers cost about one copy of the models plus their own request state.
+
+Reloads are coordinated by the parent, never by a worker. Every
+MODEL_RELOAD_INTERVAL it refreshes the registry. If a model changed, it forks
+a whole new generation of workers, waits until all of them have finished
+startup, then stops every worker of the previous generation at once. They
+stop accepting and finish what they have in flight. A worker only ever serves
+the models of its own generation, which /health reports. If the new
+generation fails to start, the parent puts its previous models back, the old
+generation keeps serving (and its replacements fork with the old models), and
+the next reload tries again.
+
+Only the thread inference executor is supported: a process executor would
+load private models again in its spawned children.
+"""
+import argparse
+import gc
+import os
+import select
+import signal
+import socket
+import tempfile
+import time
+
+import uvicorn
+
+# Read by main at import: load eagerly here, skip loading in the workers
+os.environ["PREFORK"] = "1"
+os.environ["MODEL_LOAD_MODE"] = "eager"
+# /metrics in any worker should add up all of them
+os.environ.setdefault("METRICS_DIR", tempfile.mkdtemp(prefix="flight-metrics-"))
+
+import main as api
+from logs import get_logger
+
+logger = get_logger("prefork")
+
+READY_TIMEOUT = float(os.environ.get("PREFORK_READY_TIMEOUT", "60"))
+
+
+class _WorkerServer(uvicorn.Server):
+    def __init__(self, config, ready_fd):
+        super().__init__(config)
+        self.ready_fd = ready_fd
+
+    async def startup(self, sockets=None):
+        await super().startup(sockets)
+        if self.ready_fd is not None:
+            if not self.should_exit:
+                os.write(self.ready_fd, b"1")
+            os.close(self.ready_fd)
+
+
+def _worker(sock, generation, ready_fd):
+    api.PREFORK_GENERATION = generation
+    config = uvicorn.Config(api.app, log_config=None, access_log=False, lifespan="on")
+    _WorkerServer(config, ready_fd).run(sockets=[sock])
+
+
+class Supervisor:
+    def __init__(self, sock, workers, reload_interval):
+        self.sock = sock
+        self.workers = workers
+        self.reload_interval = reload_interval
+        self.generation = 0
+        self.pids = {}  # pid -> generation
+        self._stopping = False
+
+    def _fork(self, generation, ready_fd):
+        pid = os.fork()
+        if pid == 0:
+            code = 0
+            try:
+                signal.signal(signal.SIGTERM, signal.SIG_DFL)
+                signal.signal(signal.SIGINT, signal.SIG_DFL)
+                _worker(self.sock, generation, ready_fd)
+            except BaseException:
+                logger.exception("worker crashed")
+                code = 1
+            finally:
+                os._exit(code)
+        self.pids[pid] = generation
+        return pid
+
+    def _spawn_generation(self, generation):
+        """Forks a full set of workers; returns their pids once all are ready, or None."""
+        # Anything the registry allocated since the last fork becomes part of the frozen, shared heap
+        gc.unfreeze()
+        gc.collect()
+        gc.freeze()
+        read_fd, write_fd = os.pipe()
+        try:
+            pids = [self._fork(generation, write_fd) for _ in range(self.workers)]
+            ready = 0
+            deadline = time.monotonic() + READY_TIMEOUT
+            while ready < len(pids):
+                remaining = deadline - time.monotonic()
+                if remaining <= 0 or not select.select([read_fd], [], [], remaining)[0]:
+                    break
+                ready += len(os.read(read_fd, len(pids) - ready))
+        finally:
+            os.close(read_fd)
+            os.close(write_fd)
+        if ready < len(pids):
+            logger.error("generation %d: only %d of %d workers started", generation, ready, len(pids))
+            self._stop(pids)
+            return None
+        return pids
+
+    def _stop(self, pids):
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+
+    def _reap(self):
+        """Collects exited workers; replaces ones from the current generation."""
+        while True:
+            try:
+                pid, status = os.waitpid(-1, os.WNOHANG)
+            except ChildProcessError:
+                return
+            if pid == 0:
+                return
+            generation = self.pids.pop(pid, None)
+            if generation == self.generation and not self._stopping:
+                logger.warning("worker %d exited (status %d), replacing it", pid, status)
+                self._spawn_replacement()
+
+    def _spawn_replacement(self):
+        self._fork(self.generation, None)
+
+    def _reload(self):
+        previous = api.REGISTRY.checkpoint()
+        swapped = api.REGISTRY.refresh()
+        if not swapped:
+            return
+        generation = self.generation + 1
+        logger.info("models changed (%s), starting generation %d", ", ".join(swapped), generation)
+        if self._spawn_generation(generation) is None:
+            # Replacement workers fork from this process: they must get the old models, and
+            # the restored stamps make the next reload try the new files again
+            api.REGISTRY.restore(previous)
+            logger.error("keeping generation %d", self.generation)
+            return
+        old = [pid for pid, g in self.pids.items() if g != generation]
+        self.generation = generation
+        self._stop(old)
+        logger.info("generation %d serving, stopped %d old workers", generation, len(old))
+
+    def _handle_exit(self, signum, frame):
+        self._stopping = True
+
+    def run(self):
+        signal.signal(signal.SIGTERM, self._handle_exit)
+        signal.signal(signal.SIGINT, self._handle_exit)
+        if self._spawn_generation(self.generation) is None:
+            raise SystemExit("workers failed to start")
+        logger.info("serving with %d workers", self.workers)
+
+        next_reload = time.monotonic() + self.reload_interval
+        while not self._stopping:
+            time.sleep(0.2)
+            self._reap()
+            if self.reload_interval > 0 and time.monotonic() >= next_reload:
+                self._reload()
+                next_reload = time.monotonic() + self.reload_interval
+
+        self._stop(list(self.pids))
+        deadline = time.monotonic() + 10
+        while self.pids and time.monotonic() < deadline:
+            time.sleep(0.1)
+            self._reap()
+        self._stop(list(self.pids))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--reload-interval", type=float,
+                        default=float(os.environ.get("MODEL_RELOAD_INTERVAL", "5")),
+                        help="seconds between model file checks (0 disables reloads)")
+    args = parser.parse_args()
+    if api.EXECUTOR.kind != "thread":
+        parser.error("prefork serving needs INFERENCE_EXECUTOR=thread")
+
+    api.REGISTRY.load_all()
+    sock = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    sock.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEADDR, 1)
+    sock.bind((args.host, args.port))
+    sock.listen(2048)
+    sock.set_inheritable(True)
+
+    Supervisor(sock, args.workers, args.reload_interval).run()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,16 @@
+import os
+
+
+def pid_alive(pid):
+    """
+    Whether process `pid` still exists. Used to tell state left behind by a
+    dead worker (metrics snapshots, bulk jobs) from a live one's.
+    """
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # Exists, owned by someone else
+        pass
+    return True
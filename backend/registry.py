@@ -0,0 +1,353 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from types import MappingProxyType
+
+from compiled_forest import ARRAYS_FILE, CompiledForestPipeline, load_flight_arrays
+from drift import PROFILE_FILES
+from encoding import compile_encoders
+from lazy_imports import lazy_import
+from logs import get_logger
+from metrics import MODEL_LOAD_SECONDS
+from route_cube import CUBE_FILE, RouteCube
+from seasonal_index import ArraySeasonalIndex, SeasonalIndex
+
+joblib = lazy_import("joblib")
+np = lazy_import("numpy")
+
+PREDICTION_TABLE = "flight_predictions.npz"
+# Written by train_modelbc next to flight_model.pkl: the /options lists without loading the model
+OPTIONS_FILE = "flight_options.json"
+# "numpy" also compiles the fitted Pipeline into a CompiledForestPipeline; "sklearn" skips that
+CHART2_ENGINE = os.environ.get("CHART2_ENGINE", "numpy")
+# Chart 3 code used for unseen airline/airport/status labels; unset rejects them
+SEVERITY_UNKNOWN_CODE = os.environ.get("SEVERITY_UNKNOWN_CODE")
+
+logger = get_logger("registry")
+
+
+def _load_build_arrays(path, filename, build_id):
+    """An .npz next to the model, if it was built with this exact model."""
+    table_path = os.path.join(os.path.dirname(path), filename)
+    if build_id is None or not os.path.exists(table_path):
+        return None
+    with np.load(table_path) as table:
+        if str(table["build_id"]) != build_id:
+            logger.warning("%s is from another build, ignoring it", filename)
+            return None
+        return {key: table[key] for key in table.files}
+
+
+def _normalize_flight(pkg, path):
+    """
+    Chart 2 bundle: pipeline + avg_df (or its mapped columns, "avg") + threshold
+    + dropdown lists, plus the lookup index and route cube.
+    """
+    bundle = dict(pkg)
+    bundle["compiled"] = None
+    if isinstance(bundle["pipeline"], CompiledForestPipeline):
+        bundle["compiled"] = bundle["pipeline"]
+    elif CHART2_ENGINE == "numpy":
+        try:
+            bundle["compiled"] = CompiledForestPipeline.from_pipeline(bundle["pipeline"])
+        except Exception as e:
+            logger.warning("Could not compile Chart 2 pipeline, serving it through sklearn: %s", e)
+    table = _load_build_arrays(path, PREDICTION_TABLE, pkg.get("build_id"))
+    if table is not None:
+        bundle["index"] = SeasonalIndex.from_table(table)
+        logger.info("Chart 2 answering from %s (%d rows)", PREDICTION_TABLE, len(bundle["index"].predictions))
+    elif "avg" in pkg:
+        # flight_model.arrays: answered from the mapped columns, no DataFrame or dicts per row
+        bundle["index"] = ArraySeasonalIndex(pkg["carriers"], pkg["airports"], pkg["avg"], pkg.get("avg_slots"))
+    else:
+        bundle["index"] = SeasonalIndex.from_avg_df(pkg["avg_df"])
+    cube = _load_build_arrays(path, CUBE_FILE, pkg.get("build_id"))
+    if cube is not None:
+        bundle["cube"] = RouteCube.from_arrays(cube)
+    elif "avg" in pkg:
+        avg = pkg["avg"]
+        bundle["cube"] = RouteCube.from_codes(
+            pkg["carriers"], pkg["airports"], avg["carrier"], avg["airport"], avg["month"],
+            avg["WeatherDelayProportion"], avg["TotalFlights"],
+        )
+    else:
+        bundle["cube"] = RouteCube.from_avg_df(pkg["avg_df"], pkg.get("carriers"), pkg.get("airports"))
+    return bundle
+
+
+def _normalize_severity(pkg, path):
+    """Chart 3 bundle: KNN / IndexedSeverityModel + scaler + encoders (and their tables) + feature order."""
+    if isinstance(pkg, dict):
+        encoders = dict(pkg.get("encoders") or {})
+        unknown = int(SEVERITY_UNKNOWN_CODE) if SEVERITY_UNKNOWN_CODE else None
+        return {
+            "model": pkg.get("model"),
+            "scaler": pkg.get("scaler"),
+            "encoders": MappingProxyType(encoders),
+            "tables": MappingProxyType(compile_encoders(encoders, unknown)),
+            "feature_order": tuple(pkg.get("feature_order") or ()),
+            "profile": pkg.get("profile"),
+        }
+    # Older bundles pickled the bare estimator
+    return {"model": pkg, "scaler": None, "encoders": MappingProxyType({}), "tables": MappingProxyType({}),
+            "feature_order": (), "profile": None}
+
+
+def _normalize_simple(pkg, path):
+    return {"model": pkg}
+
+
+def _file_hash(path):
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# name -> (file names in order of preference, normalizer, joblib.load kwargs)
+MODEL_SPECS = {
+    # The flat array export loads in milliseconds and is shared via the page cache
+    "flight": ((ARRAYS_FILE, "flight_model.pkl"), _normalize_flight, {}),
+    # Severity arrays (KD-tree, vote counts) are memory-mapped rather than copied.
+    # A new model must be renamed into place (write elsewhere, then mv / os.replace):
+    # truncating or `cp`-ing over the mapped file crashes every process using it (SIGBUS)
+    "severity": (("delay_severity_model.pkl",), _normalize_severity, {"mmap_mode": "r"}),
+    "simple": (("simple_model.pkl",), _normalize_simple, {}),
+}
+
+
+class ModelRegistry:
+    """
+    Loads every model bundle once and hands out read-only snapshots.
+
+    Handlers should call get() once per request and keep using that snapshot,
+    so a hot-swap in the middle of a request never mixes old and new parts.
+
+    Models passed to defer() are not loaded by load_all() or the watcher;
+    ensure() materializes them on first use (or warm() in the background).
+    """
+
+    def __init__(self, base_dir, specs=None):
+        self.base_dir = base_dir
+        self.specs = dict(specs or MODEL_SPECS)
+        self._lock = threading.Lock()
+        self._snapshots = {}
+        self._stamps = {}
+        self._watcher = None
+        self._stop = threading.Event()
+        self._deferred = set()
+        self._name_locks = {name: threading.Lock() for name in self.specs}
+        self._states = {}
+        self._load_seconds = {}
+        self._options = (None, None)  # (sidecar stamp, parsed sidecar)
+        self._profiles = {}  # name -> (sidecar stamp, parsed sidecar)
+
+    def path_for(self, name):
+        candidates = [os.path.join(self.base_dir, f) for f in self.specs[name][0]]
+        return next((p for p in candidates if os.path.exists(p)), candidates[-1])
+
+    def get(self, name):
+        # Plain dict read: the reference is replaced atomically on swap
+        return self._snapshots.get(name)
+
+    def loaded(self):
+        return sorted(self._snapshots)
+
+    def available(self, name):
+        """Loaded, or loadable on demand."""
+        return name in self._snapshots or (name in self._deferred and os.path.exists(self.path_for(name)))
+
+    def defer(self, names):
+        self._deferred.update(names)
+
+    def ensure(self, name):
+        """The current snapshot, loading it first if it was deferred. Blocking."""
+        snapshot = self._snapshots.get(name)
+        if snapshot is not None or name not in self._deferred:
+            return snapshot
+        with self._name_locks[name]:
+            # Another thread may have loaded it while we waited
+            snapshot = self._snapshots.get(name)
+            if snapshot is None:
+                try:
+                    snapshot = self.load(name)
+                    if snapshot is not None:
+                        logger.info("%s model loaded on demand", name)
+                except Exception as e:
+                    logger.error("%s model error: %s", name, e)
+            return snapshot
+
+    def warm(self, names):
+        """Loads deferred models one by one on a background thread."""
+        def _warm():
+            for name in names:
+                self.ensure(name)
+
+        threading.Thread(target=_warm, name="model-warmup", daemon=True).start()
+
+    def options(self):
+        """Chart 2 dropdown lists: from the loaded model, else from the training sidecar."""
+        pkg = self.get("flight")
+        if pkg:
+            return {"carriers": list(pkg["carriers"]), "airports": list(pkg["airports"])}
+        path = os.path.join(self.base_dir, OPTIONS_FILE)
+        try:
+            stamp = self._stamp(path)
+        except FileNotFoundError:
+            return {"carriers": [], "airports": []}
+        cached_stamp, options = self._options
+        if cached_stamp != stamp:
+            with open(path) as f:
+                sidecar = json.load(f)
+            options = {"carriers": sidecar["carriers"], "airports": sidecar["airports"]}
+            self._options = (stamp, options)
+        return options
+
+    def profile(self, name):
+        """Training profile for drift: from the loaded model, else from its training sidecar."""
+        pkg = self.get(name)
+        if pkg:
+            return pkg.get("profile")
+        path = os.path.join(self.base_dir, PROFILE_FILES[name])
+        try:
+            stamp = self._stamp(path)
+        except FileNotFoundError:
+            return None
+        cached_stamp, profile = self._profiles.get(name, (None, None))
+        if cached_stamp != stamp:
+            with open(path) as f:
+                profile = json.load(f)
+            self._profiles[name] = (stamp, profile)
+        return profile
+
+    def status(self):
+        """Per-model readiness for /health."""
+        report = {}
+        for name in self.specs:
+            state = self._states.get(name)
+            if state is None:
+                state = "deferred" if name in self._deferred else "not_loaded"
+                if not os.path.exists(self.path_for(name)):
+                    state = "missing"
+            report[name] = {
+                "state": state,
+                "version": self.version(name),
+                "load_seconds": self._load_seconds.get(name),
+            }
+        return report
+
+    def version(self, name):
+        snapshot = self.get(name)
+        return snapshot["version"] if snapshot else None
+
+    def _stamp(self, path):
+        st = os.stat(path)
+        return (st.st_mtime_ns, st.st_size)
+
+    def load(self, name):
+        """Load (or reload) one bundle and swap it in. Returns the new snapshot or None."""
+        path = self.path_for(name)
+        if not os.path.exists(path):
+            logger.warning("%s not found", os.path.basename(path))
+            self._states[name] = "missing"
+            return None
+
+        start = time.perf_counter()
+        if name not in self._snapshots:
+            self._states[name] = "loading"
+        stamp = self._stamp(path)
+        version = _file_hash(path)
+        _, normalize, load_kwargs = self.specs[name]
+        try:
+            if path.endswith(ARRAYS_FILE):
+                pkg = load_flight_arrays(path)
+            else:
+                pkg = joblib.load(path, **load_kwargs)
+            bundle = normalize(pkg, path)
+        except Exception:
+            if name not in self._snapshots:
+                self._states[name] = "error"
+            raise
+        # Content hash of the file: keys caches so a swap invalidates them
+        bundle["version"] = version
+        snapshot = MappingProxyType(bundle)
+
+        with self._lock:
+            self._snapshots[name] = snapshot
+            self._stamps[name] = stamp
+            self._states[name] = "ready"
+        self._load_seconds[name] = time.perf_counter() - start
+        MODEL_LOAD_SECONDS.set(self._load_seconds[name], name)
+        return snapshot
+
+    def load_all(self):
+        for name in self.specs:
+            if name in self._deferred:
+                continue
+            try:
+                if self.load(name) is not None:
+                    logger.info("%s model loaded", name)
+            except Exception as e:
+                logger.error("%s model error: %s", name, e)
+
+    def refresh(self):
+        """Reload any bundle whose file changed on disk. Returns the names swapped."""
+        swapped = []
+        for name in self.specs:
+            path = self.path_for(name)
+            try:
+                stamp = self._stamp(path)
+            except FileNotFoundError:
+                continue
+            if name not in self._snapshots and name in self._deferred:
+                continue  # ensure() loads the current file when it is first needed
+            if self._stamps.get(name) == stamp:
+                continue
+            try:
+                self.load(name)
+                swapped.append(name)
+                logger.info("%s model hot-swapped", name)
+            except Exception as e:
+                # Half-written file or bad pickle: keep serving the old snapshot
+                logger.warning("%s reload failed, keeping previous model: %s", name, e)
+        return swapped
+
+    def checkpoint(self):
+        """The loaded snapshots and their file stamps, for restore()."""
+        with self._lock:
+            return dict(self._snapshots), dict(self._stamps), dict(self._states), dict(self._load_seconds)
+
+    def restore(self, checkpoint):
+        """
+        Puts back what checkpoint() saw, undoing any swap since. The stamps
+        go back too, so the next refresh() loads the changed files again.
+        """
+        snapshots, stamps, states, load_seconds = checkpoint
+        with self._lock:
+            self._snapshots = dict(snapshots)
+            self._stamps = dict(stamps)
+            self._states = dict(states)
+        self._load_seconds = dict(load_seconds)
+        for name, seconds in load_seconds.items():
+            MODEL_LOAD_SECONDS.set(seconds, name)
+
+    def start_watcher(self, interval):
+        if interval <= 0 or self._watcher is not None:
+            return
+
+        def _poll():
+            while not self._stop.wait(interval):
+                self.refresh()
+
+        self._stop.clear()
+        self._watcher = threading.Thread(target=_poll, name="model-watcher", daemon=True)
+        self._watcher.start()
+
+    def stop_watcher(self):
+        self._stop.set()
+        if self._watcher is not None:
+            self._watcher.join(timeout=1)
+            self._watcher = None
@@ -0,0 +1,122 @@
+"""
+Dense (carrier, airport, month) aggregate cube for the dashboard charts.
+
+avg_df is pivoted once into two float arrays of shape (carriers, airports, 12):
+
+    risk:    WeatherDelayProportion, NaN where the route never flew that month
+    flights: TotalFlights, 0 where the route never flew that month
+
+Axes are integer-coded by position in the sorted carrier / airport lists, so
+any slice (all carriers at an airport, all airports for a carrier, one route
+over a year) is plain array indexing, and top-N is an argpartition over the
+slice rather than a DataFrame scan and sort. Leaving `month` out of a query
+folds the 12 months into one cell: flights add up and risk is their
+flight-weighted mean.
+
+train_modelbc.py writes the cube to flight_cube.npz under the model's
+build_id; the registry rebuilds it from avg_df (or the columns of
+flight_model.arrays) when that file is missing or from another build.
+"""
+from lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+pd = lazy_import("pandas")
+
+CUBE_FILE = "flight_cube.npz"
+MONTHS = 12
+ORDERS = ("lowest", "highest")
+
+
+class RouteCube:
+    def __init__(self, carriers, airports, risk, flights):
+        self.carriers = tuple(carriers)
+        self.airports = tuple(airports)
+        self.carrier_codes = {c: i for i, c in enumerate(self.carriers)}
+        self.airport_codes = {a: i for i, a in enumerate(self.airports)}
+        self.risk = risk
+        self.flights = flights
+
+    @classmethod
+    def from_avg_df(cls, avg_df, carriers=None, airports=None):
+        carriers = sorted(avg_df["carrier"].unique().tolist()) if carriers is None else list(carriers)
+        airports = sorted(avg_df["airport"].unique().tolist()) if airports is None else list(airports)
+        return cls.from_codes(
+            carriers, airports,
+            pd.Categorical(avg_df["carrier"], categories=carriers).codes,
+            pd.Categorical(avg_df["airport"], categories=airports).codes,
+            avg_df["month"].to_numpy(), avg_df["WeatherDelayProportion"].to_numpy(), avg_df["TotalFlights"].to_numpy(),
+        )
+
+    @classmethod
+    def from_codes(cls, carriers, airports, carrier_codes, airport_codes, months, risk, flights):
+        """Same as from_avg_df, from its columns with carrier / airport already coded."""
+        c = np.asarray(carrier_codes)
+        a = np.asarray(airport_codes)
+        m = np.asarray(months).astype(np.int64) - 1
+        seen = (c >= 0) & (a >= 0) & (m >= 0) & (m < MONTHS)
+
+        cube_risk = np.full((len(carriers), len(airports), MONTHS), np.nan)
+        cube_flights = np.zeros((len(carriers), len(airports), MONTHS))
+        cube_risk[c[seen], a[seen], m[seen]] = np.asarray(risk, dtype=np.float64)[seen]
+        cube_flights[c[seen], a[seen], m[seen]] = np.asarray(flights, dtype=np.float64)[seen]
+        return cls(carriers, airports, cube_risk, cube_flights)
+
+    @classmethod
+    def from_arrays(cls, arrays):
+        return cls(arrays["carriers"].tolist(), arrays["airports"].tolist(), arrays["risk"], arrays["flights"])
+
+    def to_arrays(self, build_id):
+        return {
+            "build_id": np.array(build_id),
+            "carriers": np.array(self.carriers, dtype=str),
+            "airports": np.array(self.airports, dtype=str),
+            "risk": self.risk,
+            "flights": self.flights,
+        }
+
+    def query(self, carrier=None, airport=None, month=None, top=None, order="lowest", min_flights=0):
+        """
+        Cells of the slice fixed by whichever of carrier / airport / month are
+        given, as {"carrier", "airport", "month", "risk_score", "flight_volume"}
+        sorted by risk (`order`). Cells with fewer than `min_flights` flights,
+        or none at all, are left out. `top` keeps only the first N after
+        sorting. Returns (cells, number of matching cells before `top`).
+        Unknown carrier or airport names raise KeyError.
+        """
+        if order not in ORDERS:
+            raise ValueError(f"order must be one of {ORDERS}")
+        c = slice(None) if carrier is None else self.carrier_codes[carrier]
+        a = slice(None) if airport is None else self.airport_codes[airport]
+
+        if month is None:
+            flights = self.flights[c, a].sum(axis=-1)
+            weighted = np.nansum(self.risk[c, a] * self.flights[c, a], axis=-1)
+            with np.errstate(invalid="ignore", divide="ignore"):
+                risk = weighted / flights
+        else:
+            flights = self.flights[c, a, month - 1]
+            risk = self.risk[c, a, month - 1]
+
+        # Whatever is left is 0-d, 1-d (carriers or airports) or 2-d (carriers x airports)
+        flights, risk = np.atleast_1d(flights).ravel(), np.atleast_1d(risk).ravel()
+        keep = (flights > 0) & (flights >= min_flights) & ~np.isnan(risk)
+        positions = np.flatnonzero(keep)
+        key = risk[positions] if order == "lowest" else -risk[positions]
+        if top is not None and top < len(positions):
+            part = np.argpartition(key, top - 1)[:top]
+            chosen = positions[part[np.argsort(key[part], kind="stable")]]
+        else:
+            chosen = positions[np.argsort(key, kind="stable")]
+
+        n_airports = 1 if airport is not None else len(self.airports)
+        cells = [
+            {
+                "carrier": carrier if carrier is not None else self.carriers[p // n_airports],
+                "airport": airport if airport is not None else self.airports[p % n_airports],
+                "month": month,
+                "risk_score": float(risk[p]),
+                "flight_volume": int(flights[p]),
+            }
+            for p in chosen.tolist()
+        ]
+        return cells, len(positions)
@@ -0,0 +1,109 @@
+"""
+Request models for the typed per-chart endpoints, plus the JSON response
+class they answer with.
+
+Chart 3's categorical fields are plain strings checked against the loaded
+encoders by unseen_labels(), after Pydantic: the route tallies the payload
+for drift monitoring before it answers 422, which a Literal type rejecting
+the body inside Pydantic would not allow. When a fallback code is
+configured (SEVERITY_UNKNOWN_CODE) unseen labels are scored with that code.
+"""
+import json
+from datetime import datetime
+
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import Response
+from pydantic import BaseModel, Field, ValidationError, field_validator
+
+from inference import SEVERITY_FIELDS
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - the stdlib encoder still works, only slower
+    orjson = None
+
+DEPARTURE_TIME_FORMAT = "%d/%m/%Y %H:%M"
+
+
+# -------------------------------------------------------
+# REQUESTS
+# -------------------------------------------------------
+class CalculatorRequest(BaseModel):
+    """Chart 1: the delay calculator."""
+    weather_delay_count: float = 0
+    carrier_delay_count: float = 0
+    late_aircraft_count: float = 0
+    cancelled_flights: float = 0
+
+
+class SeasonalRequest(BaseModel):
+    """Chart 2: seasonal weather risk for one carrier at one airport."""
+    year: int
+    month: int = Field(ge=1, le=12)
+    carrier: str
+    airport: str
+
+
+class SeverityRequest(BaseModel):
+    """Chart 3: delay severity for one flight (labels are checked by unseen_labels)."""
+    Airline: str
+    Departure_Airport: str
+    Arrival_Airport: str
+    Flight_Status: str
+    Departure_Time: str
+
+    @field_validator("Departure_Time")
+    @classmethod
+    def _check_time(cls, value):
+        try:
+            datetime.strptime(value, DEPARTURE_TIME_FORMAT)
+        except ValueError:
+            raise ValueError(f"Invalid Departure_Time format. Received: {value}")
+        return value
+
+
+def unseen_labels(bundle, req):
+    """422 error entries for labels the encoders never saw (none when a fallback code is set)."""
+    tables = bundle["tables"]
+    errors = []
+    for field, enc_name, _ in SEVERITY_FIELDS:
+        table = tables[enc_name]
+        value = getattr(req, field)
+        if table.unknown is None and value not in table.codes:
+            errors.append({
+                "type": "value_error",
+                "loc": ("body", field),
+                "msg": f"Value not found in training data: {field}={value!r}",
+                "input": value,
+            })
+    return errors
+
+
+def validate_json(model, body):
+    """Parses and validates a raw JSON body in one pass; errors become FastAPI's usual 422."""
+    try:
+        return model.model_validate_json(body)
+    except ValidationError as e:
+        raise RequestValidationError([
+            {**error, "loc": ("body", *error["loc"])} for error in e.errors(include_url=False)
+        ])
+
+
+# -------------------------------------------------------
+# RESPONSES
+# -------------------------------------------------------
+def _default(value):
+    # NumPy scalars from the models (stdlib fallback only)
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+class FastJSONResponse(Response):
+    """Serializes the result dict straight to bytes, skipping jsonable_encoder."""
+    media_type = "application/json"
+
+    def render(self, content):
+        if orjson is not None:
+            return orjson.dumps(content, option=orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS)
+        return json.dumps(content, default=_default, separators=(",", ":")).encode()
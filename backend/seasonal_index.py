@@ -0,0 +1,223 @@
+from lazy_imports import lazy_import
+
+np = lazy_import("numpy")
+
+MONTHS = range(1, 13)
+COMPETITOR_LIMIT = 3
+
+
+def _trend_point(month, risk, volume):
+    return {"month": month, "risk_score": float(risk), "flight_volume": int(volume)}
+
+
+EMPTY_TREND = [_trend_point(m, 0, 0) for m in MONTHS]
+
+
+class SeasonalIndex:
+    """
+    Hash index over avg_df for Chart 2, built once per loaded model.
+
+    rows:        (carrier, airport, month) -> feature row (dict)
+    trends:      (carrier, airport)        -> 12 trend points, months 1-12
+    competitors: (airport, month)          -> [(carrier, point)] sorted by lowest risk
+    mean_row:    numeric column means, used when a route/month was never seen
+    predictions: (carrier, airport, month) -> (risk_class, confidence_high_risk),
+                 only when built from a precomputed table
+
+    Everything handed out is shared between requests and must not be mutated.
+    """
+
+    def __init__(self, rows, trends, competitors, mean_row, predictions=None):
+        self.rows = rows
+        self.trends = trends
+        self.competitors = competitors
+        self.mean_row = mean_row
+        self.predictions = predictions or {}
+
+    @classmethod
+    def from_avg_df(cls, avg_df):
+        records = avg_df.to_dict("records")
+        rows = {}
+        route_months = {}
+        by_slot = {}
+        for rec in records:
+            carrier, airport, month = rec["carrier"], rec["airport"], int(rec["month"])
+            rows[(carrier, airport, month)] = rec
+            risk, volume = rec["WeatherDelayProportion"], rec["TotalFlights"]
+            route_months.setdefault((carrier, airport), {})[month] = (risk, volume)
+            by_slot.setdefault((airport, month), []).append(
+                (risk, carrier, {
+                    "carrier": carrier,
+                    "risk_score": float(risk),
+                    "flight_volume": int(volume),
+                })
+            )
+
+        trends = {
+            route: [_trend_point(m, *months.get(m, (0, 0))) for m in MONTHS]
+            for route, months in route_months.items()
+        }
+        competitors = {
+            slot: tuple((carrier, point) for _, carrier, point in sorted(entries, key=lambda e: e[0]))
+            for slot, entries in by_slot.items()
+        }
+        mean_row = avg_df.mean(numeric_only=True).to_dict()
+        return cls(rows, trends, competitors, mean_row)
+
+    @classmethod
+    def from_table(cls, table):
+        """Builds the index from flight_predictions.npz written by train_modelbc.py --precompute."""
+        carriers = table["carriers"].tolist()
+        airports = table["airports"].tolist()
+
+        rows = {}
+        predictions = {}
+        for c, a, m, risk_class, conf, prop in zip(
+            table["carrier_code"].tolist(), table["airport_code"].tolist(), table["month"].tolist(),
+            table["risk_class"].tolist(), table["confidence_high_risk"].tolist(),
+            table["historical_weather_prop"].tolist(),
+        ):
+            key = (carriers[c], airports[a], m)
+            rows[key] = {"carrier": key[0], "airport": key[1], "month": m, "WeatherDelayProportion": prop}
+            predictions[key] = (risk_class, conf)
+
+        trends = {}
+        for c, a, risks, volumes in zip(
+            table["trend_carrier"].tolist(), table["trend_airport"].tolist(),
+            table["trend_risk"].tolist(), table["trend_volume"].tolist(),
+        ):
+            trends[(carriers[c], airports[a])] = [
+                _trend_point(m, risk, volume) for m, risk, volume in zip(MONTHS, risks, volumes)
+            ]
+
+        competitors = {}
+        for a, m, codes, risks, volumes in zip(
+            table["comp_airport"].tolist(), table["comp_month"].tolist(),
+            table["comp_carrier"].tolist(), table["comp_risk"].tolist(), table["comp_volume"].tolist(),
+        ):
+            competitors[(airports[a], m)] = tuple(
+                (carriers[c], {"carrier": carriers[c], "risk_score": float(risk), "flight_volume": int(volume)})
+                for c, risk, volume in zip(codes, risks, volumes) if c >= 0
+            )
+
+        mean_row = dict(zip(table["mean_row_columns"].tolist(), table["mean_row_values"].tolist()))
+        return cls(rows, trends, competitors, mean_row, predictions)
+
+    def row(self, carrier, airport, month):
+        """Exact historical row, or None."""
+        return self.rows.get((carrier, airport, month))
+
+    def prediction(self, carrier, airport, month):
+        """Precomputed (risk_class, confidence_high_risk), or None."""
+        return self.predictions.get((carrier, airport, month))
+
+    def fallback_row(self, carrier, airport, month):
+        row = dict(self.mean_row)
+        row.update(month=month, carrier=carrier, airport=airport)
+        return row
+
+    def yearly_trend(self, carrier, airport):
+        return self.trends.get((carrier, airport), EMPTY_TREND)
+
+    def competitor_analysis(self, current_carrier, airport, month, limit=COMPETITOR_LIMIT):
+        results = []
+        for carrier, point in self.competitors.get((airport, month), ()):
+            if carrier == current_carrier:
+                continue
+            results.append(point)
+            if len(results) == limit:
+                break
+        return results
+
+
+def route_slots(carrier_codes, airport_codes, months, n_carriers, n_airports):
+    """(carriers, airports, 12) int32 array: row number of each route/month, -1 where it never flew."""
+    slots = np.full((n_carriers, n_airports, len(MONTHS)), -1, dtype=np.int32)
+    m = np.asarray(months, dtype=np.int64) - 1
+    seen = (np.asarray(carrier_codes) >= 0) & (np.asarray(airport_codes) >= 0) & (m >= 0) & (m < len(MONTHS))
+    slots[np.asarray(carrier_codes)[seen], np.asarray(airport_codes)[seen], m[seen]] = np.flatnonzero(seen)
+    return slots
+
+
+class ArraySeasonalIndex:
+    """
+    SeasonalIndex answered straight from avg_df's columns as arrays.
+
+    Used for flight_model.arrays: `columns` are the memory-mapped views
+    (carrier / airport as codes into the `carriers` / `airports` lists) and
+    `slots` is route_slots() over them. Nothing is built per row at load
+    time; a row, trend or competitor list is assembled when asked for, so
+    the aggregate table stays in the shared mapping instead of in every
+    process's heap. Same methods and answers as SeasonalIndex.
+    """
+
+    def __init__(self, carriers, airports, columns, slots=None):
+        self.carriers = tuple(carriers)
+        self.airports = tuple(airports)
+        self.carrier_codes = {c: i for i, c in enumerate(self.carriers)}
+        self.airport_codes = {a: i for i, a in enumerate(self.airports)}
+        self.columns = columns
+        if slots is None:
+            slots = route_slots(columns["carrier"], columns["airport"], columns["month"],
+                                len(self.carriers), len(self.airports))
+        self.slots = slots
+        self.risk = columns["WeatherDelayProportion"]
+        self.volume = columns["TotalFlights"]
+        self.mean_row = {
+            name: float(np.nanmean(values)) for name, values in columns.items() if name not in ("carrier", "airport")
+        }
+
+    def _row(self, r):
+        row = {name: values[r].item() for name, values in self.columns.items()}
+        row["carrier"] = self.carriers[row["carrier"]]
+        row["airport"] = self.airports[row["airport"]]
+        return row
+
+    def row(self, carrier, airport, month):
+        """Exact historical row, or None."""
+        c, a = self.carrier_codes.get(carrier), self.airport_codes.get(airport)
+        if c is None or a is None or month not in MONTHS:
+            return None
+        r = int(self.slots[c, a, month - 1])
+        return self._row(r) if r >= 0 else None
+
+    def prediction(self, carrier, airport, month):
+        return None
+
+    def fallback_row(self, carrier, airport, month):
+        row = dict(self.mean_row)
+        row.update(month=month, carrier=carrier, airport=airport)
+        return row
+
+    def yearly_trend(self, carrier, airport):
+        c, a = self.carrier_codes.get(carrier), self.airport_codes.get(airport)
+        if c is None or a is None:
+            return EMPTY_TREND
+        rows = self.slots[c, a].tolist()
+        if max(rows) < 0:
+            return EMPTY_TREND
+        return [
+            _trend_point(m, self.risk[r], self.volume[r]) if r >= 0 else _trend_point(m, 0, 0)
+            for m, r in zip(MONTHS, rows)
+        ]
+
+    def competitor_analysis(self, current_carrier, airport, month, limit=COMPETITOR_LIMIT):
+        a = self.airport_codes.get(airport)
+        if a is None or month not in MONTHS:
+            return []
+        rows = self.slots[:, a, month - 1]
+        # Row order, then a stable sort by risk: the same tie-break as SeasonalIndex
+        rows = np.sort(rows[rows >= 0])
+        results = []
+        for r in rows[np.argsort(self.risk[rows], kind="stable")].tolist():
+            carrier = self.carriers[self.columns["carrier"][r]]
+            if carrier == current_carrier:
+                continue
+            results.append({
+                "carrier": carrier,
+                "risk_score": float(self.risk[r]),
+                "flight_volume": int(self.volume[r]),
+            })
+            if len(results) == limit:
+                break
+        return results
@@ -0,0 +1,63 @@
+import numpy as np
+from sklearn.neighbors import KDTree
+
+
+class IndexedSeverityModel:
+    """
+    k-nearest-neighbour severity classifier over an explicit KD-tree.
+
+    Identical encoded feature vectors are collapsed into one tree point with
+    per-class counts, so the index grows with the number of distinct flights
+    rather than the number of rows. The tree and the count table are plain
+    NumPy arrays: dump the bundle uncompressed with joblib and load it with
+    mmap_mode="r" to share the pages between processes.
+
+    Exposes the classes_ / predict / predict_proba surface the server already
+    uses for KNeighborsClassifier (uniform weights).
+    """
+
+    def __init__(self, n_neighbors=5, leaf_size=40):
+        self.n_neighbors = n_neighbors
+        self.leaf_size = leaf_size
+        self.classes_ = None
+        self.counts_ = None
+        self.tree_ = None
+
+    def fit(self, X, y):
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        self.classes_, y_codes = np.unique(np.asarray(y), return_inverse=True)
+
+        points, point_idx = np.unique(X, axis=0, return_inverse=True)
+        counts = np.zeros((len(points), len(self.classes_)), dtype=np.int32)
+        np.add.at(counts, (point_idx.ravel(), y_codes), 1)
+
+        self.counts_ = counts
+        self.tree_ = KDTree(points, leaf_size=self.leaf_size)
+        return self
+
+    @property
+    def n_points(self):
+        return len(self.counts_)
+
+    def predict_proba(self, X):
+        X = np.ascontiguousarray(X, dtype=np.float64)
+        k = self.n_neighbors
+        # At most k distinct points are needed: every point carries >= 1 vote
+        _, idx = self.tree_.query(X, k=min(k, self.n_points))
+
+        counts = self.counts_[idx]                     # (n, k', n_classes)
+        totals = counts.sum(axis=2)                    # votes behind each point
+        before = np.cumsum(totals, axis=1) - totals    # votes taken by closer points
+        take = np.clip(k - before, 0, totals)          # votes this point still contributes
+        # A point straddling the k-th vote contributes its classes pro rata
+        share = np.divide(take, totals, out=np.zeros(take.shape), where=totals > 0)
+        votes = (counts * share[:, :, None]).sum(axis=1)
+        return votes / votes.sum(axis=1, keepdims=True)
+
+    def predict(self, X):
+        return self.classes_[self.predict_proba(X).argmax(axis=1)]
+
+    @classmethod
+    def from_knn(cls, knn):
+        """Re-index a fitted KNeighborsClassifier (uniform weights) without retraining."""
+        return cls(n_neighbors=knn.n_neighbors).fit(knn._fit_X, knn.classes_[knn._y])
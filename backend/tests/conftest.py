@@ -0,0 +1,79 @@
+import json
+import os
+import subprocess
+import sys
+
+import numpy as np
+import pandas as pd
+import pytest
+
+BACKEND = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND)
+sys.path.insert(0, os.path.join(BACKEND, "model"))
+sys.path.insert(0, os.path.join(BACKEND, "benchmarks"))
+
+import synthetic  # noqa: E402
+import train_modelbc  # noqa: E402
+
+
+@pytest.fixture(scope="session")
+def trainable():
+    """A small labelled avg_df: one row per (carrier, airport, month) that flew."""
+    rng = np.random.default_rng(0)
+    keys = pd.MultiIndex.from_product(
+        [[f"C{i}" for i in range(4)], [f"A{i:02d}" for i in range(8)], range(1, 13)],
+        names=train_modelbc.GROUP_KEYS,
+    ).to_frame(index=False)
+    df = keys.sample(frac=0.7, random_state=0).reset_index(drop=True)
+    n = len(df)
+    flights = rng.integers(10, 3000, n).astype(float)
+    delayed = flights * rng.uniform(0.05, 0.4, n)
+    weather = delayed * rng.uniform(0, 0.2, n)
+    df["WeatherDelayProportion"] = weather / delayed
+    df["WeatherMinuteProportion"] = rng.uniform(0, 0.2, n)
+    df["TotalFlights"] = flights
+    df["WeatherDelayCount"] = weather
+    df["TotalDelayedFlights"] = delayed
+    train_modelbc.label_trainable(df)
+    return df
+
+
+@pytest.fixture(scope="session")
+def flight_pkg(trainable):
+    """A flight_model.pkl package as save_package builds it (minus the aggregates)."""
+    pipeline = train_modelbc.build_pipeline(n_estimators=15, max_depth=6)
+    pipeline.fit(trainable.drop(columns=train_modelbc.TARGET_COLUMNS), trainable["HighWeatherImpact_Class"])
+    return {
+        "pipeline": pipeline,
+        "avg_df": trainable,
+        "threshold": 0.125,
+        "carriers": sorted(trainable["carrier"].unique().tolist()),
+        "airports": sorted(trainable["airport"].unique().tolist()),
+        "build_id": "test-build",
+        "profile": None,
+    }
+
+
+@pytest.fixture(scope="session")
+def model_dir(tmp_path_factory):
+    """All three models trained on small synthetic data, servable via MODEL_DIR."""
+    return synthetic.build_models(str(tmp_path_factory.mktemp("models")), bts_rows=2000, price_rows=1500,
+                                  n_estimators=10)
+
+
+
+@pytest.fixture
+def run_app(model_dir):
+    """
+    run_app(script, **env) runs `script` (which imports main) against
+    model_dir in a fresh interpreter and returns the JSON it prints last:
+    main reads its settings from the environment at import.
+    """
+    def run(script, **env):
+        env = {**os.environ, "MODEL_DIR": model_dir, **env}
+        env.pop("METRICS_DIR", None)
+        out = subprocess.run([sys.executable, "-c", script], cwd=BACKEND, env=env,
+                             capture_output=True, text=True, timeout=120, check=True).stdout
+        return json.loads(out.strip().splitlines()[-1])
+
+    return run
@@ -0,0 +1,57 @@
+import numpy as np
+import pandas as pd
+
+import train_modelbc
+from array_store import read_arrays, write_arrays
+from compiled_forest import avg_frame, export_flight_model, load_flight_arrays
+from seasonal_index import ArraySeasonalIndex, SeasonalIndex
+
+
+def test_array_store_round_trip(tmp_path):
+    arrays = {
+        "floats": np.linspace(0, 1, 7),
+        "ints": np.arange(12, dtype=np.int32).reshape(3, 4),
+        "labels": np.array(["AA", "B6", "WN"]),
+        "scalar": np.array("build"),
+        "empty": np.zeros((0, 3)),
+    }
+    meta = {"threshold": 0.5, "columns": ["a", "b"]}
+    path = str(tmp_path / "model.arrays")
+    write_arrays(path, arrays, meta)
+
+    loaded, loaded_meta = read_arrays(path)
+    assert loaded_meta == meta
+    assert loaded.keys() == arrays.keys()
+    for name, a in arrays.items():
+        assert loaded[name].dtype == a.dtype and loaded[name].shape == a.shape
+        assert np.array_equal(loaded[name], a)
+        assert not loaded[name].flags.writeable or loaded[name].size == 0
+
+
+def test_flight_arrays_round_trip(flight_pkg, tmp_path):
+    path = str(tmp_path / "flight_model.arrays")
+    export_flight_model(flight_pkg, path)
+    pkg = load_flight_arrays(path)
+
+    for key in ("threshold", "carriers", "airports", "build_id"):
+        assert pkg[key] == flight_pkg[key]
+    pd.testing.assert_frame_equal(avg_frame(pkg), flight_pkg["avg_df"], check_dtype=False)
+    X = flight_pkg["avg_df"].drop(columns=train_modelbc.TARGET_COLUMNS)
+    assert np.array_equal(pkg["pipeline"].predict_proba(X), flight_pkg["pipeline"].predict_proba(X))
+
+
+def test_array_index_matches_dict_index(flight_pkg, tmp_path):
+    path = str(tmp_path / "flight_model.arrays")
+    export_flight_model(flight_pkg, path)
+    pkg = load_flight_arrays(path)
+    expected = SeasonalIndex.from_avg_df(flight_pkg["avg_df"])
+    index = ArraySeasonalIndex(pkg["carriers"], pkg["airports"], pkg["avg"], pkg["avg_slots"])
+
+    for carrier in pkg["carriers"] + ["ZZ"]:
+        for airport in pkg["airports"] + ["NEW"]:
+            assert index.yearly_trend(carrier, airport) == expected.yearly_trend(carrier, airport)
+            for month in range(1, 13):
+                assert index.row(carrier, airport, month) == expected.row(carrier, airport, month)
+                assert (index.competitor_analysis(carrier, airport, month)
+                        == expected.competitor_analysis(carrier, airport, month))
+    assert index.fallback_row("ZZ", "NEW", 3) == expected.fallback_row("ZZ", "NEW", 3)
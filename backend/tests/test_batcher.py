@@ -0,0 +1,25 @@
+import asyncio
+import gc
+
+from batcher import MicroBatcher
+
+
+def test_concurrent_items_share_one_batch_and_flushes_are_released():
+    calls = []
+
+    async def run_batch(kind, items):
+        calls.append(list(items))
+        # Give the collector a chance to drop an unreferenced flush task
+        gc.collect()
+        await asyncio.sleep(0.01)
+        return [item * 2 for item in items]
+
+    async def scenario():
+        batcher = MicroBatcher(run_batch, max_items=8, max_wait=0.005)
+        results = await asyncio.gather(*(batcher.submit("seasonal", i) for i in range(5)))
+        return batcher, results
+
+    batcher, results = asyncio.run(scenario())
+    assert results == [0, 2, 4, 6, 8]
+    assert calls == [[0, 1, 2, 3, 4]]
+    assert not batcher._tasks
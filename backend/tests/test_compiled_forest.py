@@ -0,0 +1,29 @@
+import numpy as np
+
+import train_modelbc
+from compiled_forest import CompiledForestPipeline
+
+
+def _features(df):
+    return df.drop(columns=train_modelbc.TARGET_COLUMNS)
+
+
+def test_predict_proba_matches_sklearn(flight_pkg):
+    pipeline = flight_pkg["pipeline"]
+    X = _features(flight_pkg["avg_df"])
+    compiled = CompiledForestPipeline.from_pipeline(pipeline)
+
+    expected = pipeline.predict_proba(X)
+    assert np.array_equal(compiled.predict_proba(X), expected)
+    assert np.array_equal(compiled.predict_proba(X.to_dict("records")), expected)
+
+
+def test_predict_proba_matches_sklearn_on_unseen_categories(flight_pkg):
+    pipeline = flight_pkg["pipeline"]
+    X = _features(flight_pkg["avg_df"]).head(20).copy()
+    X["carrier"] = ["ZZ", "C0"] * 10
+    X["airport"] = ["NEW"] * 10 + ["A01"] * 10
+    X.loc[X.index[:5], "month"] = 13
+    compiled = CompiledForestPipeline.from_pipeline(pipeline)
+
+    assert np.array_equal(compiled.predict_proba(X), pipeline.predict_proba(X))
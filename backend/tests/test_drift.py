@@ -0,0 +1,36 @@
+# main reads INFERENCE_EXECUTOR at import, so this runs in its own interpreter
+SCRIPT = """
+import json
+import time
+from fastapi.testclient import TestClient
+import main
+
+with TestClient(main.app) as client:
+    options = client.get("/options").json()
+    for month in (1, 4, 7):
+        response = client.post("/predict/seasonal", json={
+            "year": 2024, "month": month, "carrier": options["carriers"][0], "airport": options["airports"][0],
+        })
+        assert response.status_code == 200, response.text
+    # The workers export their tallies every METRICS_FLUSH_INTERVAL
+    deadline = time.monotonic() + 10
+    while True:
+        report = client.get("/drift").json()
+        month = report["seasonal"]["features"].get("month")
+        if (month and month["live_count"] == 3) or time.monotonic() > deadline:
+            break
+        time.sleep(0.05)
+    print(json.dumps({"loaded": main.REGISTRY.loaded(), "drift": report}))
+"""
+
+
+def test_drift_has_a_reference_in_process_mode(run_app):
+    result = run_app(SCRIPT, INFERENCE_EXECUTOR="process", INFERENCE_WORKERS="1", METRICS_FLUSH_INTERVAL="0.1")
+
+    # The parent never loaded a model: the reference came from the training sidecars
+    assert "flight" not in result["loaded"]
+    seasonal = result["drift"]["seasonal"]
+    assert seasonal["features"]["month"]["live_count"] == 3
+    assert seasonal["features"]["month"]["psi"] is not None
+    assert seasonal["predictions"]["psi"] is not None
+    assert result["drift"]["severity"]["has_reference"]
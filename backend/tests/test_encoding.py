@@ -0,0 +1,44 @@
+import pytest
+
+from encoding import DICT_MAX, UNKNOWN, EncodingTable
+from inference import ItemError, score_severity_batch
+from registry import ModelRegistry
+
+CLASSES = ["Delta", "JetBlue", "United"]
+
+
+@pytest.mark.parametrize("n", [DICT_MAX, DICT_MAX + 8])
+def test_non_string_values_are_unseen(n):
+    table = EncodingTable(CLASSES)
+    values = (["United", "Delta", ["x"], None, 3, {"a": 1}, "Nope"] * n)[:n]
+
+    codes = table.encode(values)
+    expected = [CLASSES.index(v) if isinstance(v, str) and v in CLASSES else UNKNOWN for v in values]
+    assert codes.tolist() == expected
+    assert EncodingTable(CLASSES, unknown=0).encode(values).tolist() == [max(c, 0) for c in expected]
+    assert table.code(["x"]) is None
+
+
+def test_batch_over_dict_max_keeps_per_item_errors(model_dir):
+    registry = ModelRegistry(model_dir)
+    bundle = registry.load("severity")
+    tables = bundle["tables"]
+    item = {
+        "Airline": tables["airline"].classes[0],
+        "Departure_Airport": tables["departure"].classes[0],
+        "Arrival_Airport": tables["arrival"].classes[1],
+        "Flight_Status": tables["status"].classes[0],
+        "Departure_Time": "01/03/2024 08:15",
+    }
+    items = [dict(item) for _ in range(DICT_MAX + 8)]
+    items[3]["Airline"] = ["x"]
+    items[10]["Flight_Status"] = {"status": "late"}
+
+    results = score_severity_batch(bundle, items)
+
+    assert len(results) == len(items)
+    for i, result in enumerate(results):
+        if i in (3, 10):
+            assert isinstance(result, ItemError) and result.status == 400
+        else:
+            assert result["predicted_severity"] in result["all_probabilities"]
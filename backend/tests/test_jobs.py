@@ -0,0 +1,37 @@
+import time
+
+from jobs import ACTIVE_STATES, BulkJobs
+
+
+class _Registry:
+    """Stands in for ModelRegistry; a job must fail before it asks for the model."""
+
+    def ensure(self, name):
+        raise AssertionError("the model should not be needed")
+
+
+def _wait(jobs, job_id, timeout=10):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        job = jobs.get(job_id)
+        if job["state"] not in ACTIVE_STATES:
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job still {job['state']}")
+
+
+def test_missing_columns_fail_the_job(tmp_path):
+    jobs = BulkJobs(str(tmp_path), _Registry())
+    job_id, input_path = jobs.new_upload()
+    with open(input_path, "w") as f:
+        f.write("Airline,Departure_Airport,Departure_Time\n")
+        f.write("Delta,JFK,27/03/2024 06:22\n")
+    try:
+        jobs.submit(job_id)
+        job = _wait(jobs, job_id)
+    finally:
+        jobs.shutdown()
+
+    assert job["state"] == "failed"
+    assert "Arrival_Airport" in job["error"] and "Flight_Status" in job["error"]
+    assert not (tmp_path / f"{job_id}.output.csv").exists()
@@ -0,0 +1,26 @@
+import os
+
+from registry import ModelRegistry
+
+
+def _touch(path):
+    st = os.stat(path)
+    os.utime(path, ns=(st.st_atime_ns, st.st_mtime_ns + 1_000_000_000))
+
+
+def test_restore_undoes_a_refresh_and_lets_it_retry(model_dir):
+    registry = ModelRegistry(model_dir)
+    registry.defer(["flight", "severity"])
+    registry.load_all()
+    before = registry.get("simple")
+    checkpoint = registry.checkpoint()
+
+    _touch(registry.path_for("simple"))
+    assert registry.refresh() == ["simple"]
+    assert registry.get("simple") is not before
+
+    registry.restore(checkpoint)
+    assert registry.get("simple") is before
+    # The stamp went back with the snapshot, so the change is picked up again
+    assert registry.refresh() == ["simple"]
+    assert registry.refresh() == []
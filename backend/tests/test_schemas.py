@@ -0,0 +1,55 @@
+import pytest
+
+SCRIPT = """
+import json
+from fastapi.testclient import TestClient
+import main
+
+with TestClient(main.app) as client:
+    tables = main.REGISTRY.ensure("severity")["tables"]
+    item = {
+        "Airline": tables["airline"].classes[0],
+        "Departure_Airport": tables["departure"].classes[0],
+        "Arrival_Airport": tables["arrival"].classes[1],
+        "Flight_Status": tables["status"].classes[0],
+        "Departure_Time": "01/03/2024 08:15",
+    }
+    responses = {}
+    for name, body in (
+        ("known", item),
+        ("unknown_airline", {**item, "Airline": "Nope"}),
+        ("unknown_two", {**item, "Arrival_Airport": "ZZZ", "Flight_Status": "Teleported"}),
+        ("not_a_string", {**item, "Airline": ["x"]}),
+    ):
+        response = client.post("/predict/severity", json=body)
+        responses[name] = [response.status_code, response.json()]
+    print(json.dumps(responses))
+"""
+
+
+def _errors(response):
+    return {tuple(error["loc"]): error["msg"] for error in response[1]["detail"]}
+
+
+def test_unknown_labels_get_a_field_specific_422(run_app):
+    responses = run_app(SCRIPT)
+
+    assert responses["known"][0] == 200
+    assert responses["unknown_airline"][0] == 422
+    assert _errors(responses["unknown_airline"]) == {
+        ("body", "Airline"): "Value not found in training data: Airline='Nope'",
+    }
+    assert responses["unknown_two"][0] == 422
+    assert set(_errors(responses["unknown_two"])) == {("body", "Arrival_Airport"), ("body", "Flight_Status")}
+    # Still a Pydantic type error before any label check
+    assert responses["not_a_string"][0] == 422
+    assert ("body", "Airline") in _errors(responses["not_a_string"])
+
+
+@pytest.mark.parametrize("fallback", ["0"])
+def test_unknown_labels_are_scored_with_a_fallback_code(run_app, fallback):
+    responses = run_app(SCRIPT, SEVERITY_UNKNOWN_CODE=fallback)
+
+    assert responses["unknown_airline"][0] == 200
+    assert responses["unknown_two"][0] == 200
+    assert responses["not_a_string"][0] == 422
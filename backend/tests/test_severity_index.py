@@ -0,0 +1,43 @@
+import numpy as np
+from sklearn.neighbors import KNeighborsClassifier
+
+from severity_index import IndexedSeverityModel
+
+CLASSES = np.array(["Major", "Minor", "No Delay"])
+
+
+def _rows(n, seed):
+    # Continuous features: no two training points are equidistant from a query,
+    # so both engines must pick exactly the same neighbours
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 8))
+    y = CLASSES[np.where(X[:, 7] > 0.5, 0, np.where(X[:, 0] > 0, 1, 2))]
+    return X, y
+
+
+def test_labels_match_knn():
+    X, y = _rows(2000, seed=0)
+    queries, _ = _rows(500, seed=1)
+    knn = KNeighborsClassifier(n_neighbors=5).fit(X, y)
+    indexed = IndexedSeverityModel(n_neighbors=5).fit(X, y)
+
+    assert np.array_equal(indexed.classes_, knn.classes_)
+    assert np.array_equal(indexed.predict(queries), knn.predict(queries))
+    assert np.allclose(indexed.predict_proba(queries), knn.predict_proba(queries))
+
+
+def test_from_knn_matches_knn():
+    X, y = _rows(1000, seed=2)
+    queries, _ = _rows(200, seed=3)
+    knn = KNeighborsClassifier(n_neighbors=7).fit(X, y)
+
+    assert np.array_equal(IndexedSeverityModel.from_knn(knn).predict(queries), knn.predict(queries))
+
+
+def test_duplicate_rows_vote_once_each():
+    X, y = _rows(300, seed=4)
+    # Every point twice: the tree holds each once, with doubled counts
+    indexed = IndexedSeverityModel(n_neighbors=4).fit(np.vstack([X, X]), np.concatenate([y, y]))
+
+    assert indexed.n_points == len(X)
+    assert np.array_equal(indexed.predict(X[:50]), KNeighborsClassifier(n_neighbors=2).fit(X, y).predict(X[:50]))
@@ -0,0 +1,71 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+import train_modelbc
+
+HEADER = [
+    "year", "month", "carrier", "carrier_name", "airport", "airport_name",
+    "Number of arriving flights", "Number of flights delayed by 15 minutes or more",
+    "Weather count (delay due to weather)", "Total arrival delay", "Delay attributed to weather",
+]
+
+
+@pytest.fixture
+def bts_csv(tmp_path):
+    """A small delay-cause CSV: repeated groups, zero-delay rows and one unparseable row."""
+    rng = np.random.default_rng(7)
+    n = 400
+    flights = rng.integers(10, 3000, n)
+    delayed = (flights * rng.uniform(0.0, 0.4, n)).astype(int)
+    total_delay = delayed * rng.uniform(0, 80, n)
+    df = pd.DataFrame({
+        "year": rng.integers(2015, 2024, n),
+        "month": rng.integers(1, 13, n),
+        "carrier": rng.choice(["AA", "DL", "WN"], n),
+        "carrier_name": "Carrier",
+        "airport": rng.choice(["ATL", "DEN", "JFK", "SEA"], n),
+        "airport_name": "Airport",
+        "Number of arriving flights": flights,
+        "Number of flights delayed by 15 minutes or more": delayed,
+        "Weather count (delay due to weather)": np.round(delayed * rng.uniform(0, 0.2, n), 2),
+        "Total arrival delay": np.round(total_delay, 1),
+        "Delay attributed to weather": np.round(total_delay * rng.uniform(0, 0.2, n), 1),
+    }, columns=HEADER)
+    df = df.astype({"Total arrival delay": object})
+    df.loc[5, "Total arrival delay"] = ""
+    path = tmp_path / "delay_cause.csv"
+    df.to_csv(path, index=False)
+    return str(path)
+
+
+def _in_memory_means(path):
+    """What the trainer did before streaming: groupby().mean() over the whole frame."""
+    df = pd.read_csv(path)
+    df.columns = [train_modelbc.clean_column_name(c) for c in df.columns]
+    df = train_modelbc.prepare_rows(df)
+    return df.groupby(train_modelbc.GROUP_KEYS)[train_modelbc.FEATURES_TO_AVERAGE].mean().reset_index()
+
+
+def _sorted(df):
+    return df.sort_values(train_modelbc.GROUP_KEYS).reset_index(drop=True)
+
+
+@pytest.mark.parametrize("chunksize", [None, 7, 37, 1000])
+def test_streamed_means_match_groupby_mean(bts_csv, chunksize):
+    expected = _sorted(_in_memory_means(bts_csv))
+    got = _sorted(train_modelbc.trainable_from_aggregates(
+        train_modelbc.load_aggregates(bts_csv, chunksize=chunksize)
+    ))
+
+    assert len(got) == len(expected)
+    for column in ("carrier", "airport"):
+        assert got[column].astype(str).tolist() == expected[column].astype(str).tolist()
+    assert np.array_equal(got["month"].to_numpy(), expected["month"].to_numpy())
+    # Chunks are read as float32, so only the in-memory path is exact
+    rtol = 1e-12 if chunksize is None else 1e-6
+    np.testing.assert_allclose(
+        got[train_modelbc.FEATURES_TO_AVERAGE].to_numpy(dtype=np.float64),
+        expected[train_modelbc.FEATURES_TO_AVERAGE].to_numpy(dtype=np.float64),
+        rtol=rtol, atol=1e-9,
+    )